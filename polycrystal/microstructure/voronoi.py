@@ -183,7 +183,9 @@ class Voronoi(CgoMicrostructure):
         return  b0 + db*useeds
 
     @classmethod
-    def random_voronoi(cls, n, box, fname=None, seedbox=None, matrix=None):
+    def random_voronoi(
+            cls, n, box, fname=None, seedbox=None, matrix=None, rng=None
+    ):
         """Generate random seeds and orientations
 
         Parameters
@@ -198,6 +200,9 @@ class Voronoi(CgoMicrostructure):
            grain shape matrix
         seedbox: (optional) array  (3, 2)
            box containing seeds
+        rng: (optional) None, int, SeedSequence or Generator
+           source of random numbers; if None, the global numpy random state
+           is used
 
         Returns
         -------
@@ -207,14 +212,18 @@ class Voronoi(CgoMicrostructure):
         # have optional dim = 3. Then have to generate random 2D matrices, but
         # that shouldn't be hard.
         #
-        seeds = np.random.rand(n, 3)
+        if rng is None:
+            seeds = np.random.rand(n, 3)
+        else:
+            rng = np.random.default_rng(rng)
+            seeds = rng.random((n, 3))
         if seedbox is None:
             seedbox = box
         for i, b in enumerate(seedbox):
             scale = b[1] - b[0]
             seeds[:, i] = scale*seeds[:, i] + b[0]
 
-        rmats = random_rmats(n)
+        rmats = random_rmats(n, rng=rng)
 
         v = cls(seeds=seeds, orientations=rmats, box=box, matrix=matrix)
         if fname is not None:
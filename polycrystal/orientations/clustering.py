@@ -0,0 +1,134 @@
+"""Clustering of orientations into grains
+
+The `cluster_orientations()` function groups orientations into clusters, for
+example grains, by linking pairs whose misorientation angle is below a
+threshold and taking the connected components. The candidate pairs can be
+restricted to spatial neighbors, e.g. from `grid_neighbor_pairs()` for voxel
+data; otherwise, all pairs within the threshold are found with a KD-tree of
+the fundamental region quaternions, which holds 4 floats per orientation.
+Only the few symmetric equivalents that can be near another orientation are
+formed, one chunk of orientations at a time.
+"""
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from . import quaternions as quats
+from .crystalsymmetry import DEFAULT_CHUNK_SIZE
+
+
+def cluster_orientations(
+        q, csym, threshold, pairs=None, chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """cluster orientations by misorientation threshold
+
+    Parameters
+    ----------
+    q: array (n, 4)
+       array of `n` quaternions
+    csym: CrystalSymmetry
+       crystal symmetry group
+    threshold: float
+       orientations whose misorientation angle is less than `threshold`
+       (radians) are linked
+    pairs: tuple of int arrays (m) or None, default = None
+       index arrays (i, j) of candidate pairs of neighbors, e.g. spatial
+       neighbors; if None, all pairs of orientations are candidates
+    chunk_size: int, default = DEFAULT_CHUNK_SIZE
+       number of pairs or orientations to process at a time
+
+    Returns
+    -------
+    int array (n)
+       cluster label for each orientation; labels are 0, 1, ..., (number of
+       clusters - 1)
+    """
+    q = np.atleast_2d(q)
+    n = len(q)
+    if pairs is None:
+        links = _links_from_tree(q, csym, threshold, chunk_size)
+    else:
+        links = _links_from_pairs(q, csym, threshold, pairs, chunk_size)
+
+    if links:
+        i, j = (np.concatenate(ij) for ij in zip(*links))
+    else:
+        i = j = np.zeros(0, dtype=int)
+    graph = coo_matrix((np.ones(len(i), dtype=bool), (i, j)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+
+    return labels
+
+
+def _links_from_pairs(q, csym, threshold, pairs, chunk_size):
+    """list of (i, j) chunks of candidate pairs below threshold"""
+    i, j = (np.asarray(p) for p in pairs)
+    links = []
+    for k0 in range(0, len(i), chunk_size):
+        ik, jk = i[k0:k0 + chunk_size], j[k0:k0 + chunk_size]
+        angles, _ = csym.pair_misorientations(q, ik, jk, chunk_size)
+        below = angles < threshold
+        links.append((ik[below], jk[below]))
+
+    return links
+
+
+def _links_from_tree(q, csym, threshold, chunk_size):
+    """list of (i, j) chunks, i < j, of all pairs below threshold"""
+    # The tree holds the fundamental region equivalents, i.e. those with the
+    # smallest rotation angle. Since misorientation angles are unchanged by
+    # multiplication on either side, an equivalent of q[i] can be within
+    # `threshold` of one of them only if its half rotation angle, arccos of
+    # the scalar part, exceeds the smallest by at most `threshold`; only
+    # those equivalents, and their negatives, are queried. For unit
+    # quaternions, the chordal distance is 2 sin(angle/4).
+    threshold = min(threshold, np.pi)
+    r = 2.0*np.sin(0.25*threshold)
+    qfr = csym.to_fundamental_region(q, chunk_size)
+    tree = cKDTree(qfr, balanced_tree=False)
+    qsymm = csym.quats
+    qconj_t = quats.inverse(qsymm).T
+    links = []
+    for k0 in range(0, len(q), chunk_size):
+        qk = q[k0:k0 + chunk_size]
+        w = np.abs(qk @ qconj_t)
+        wmin = np.cos(np.minimum(
+            np.arccos(np.minimum(w.max(axis=1), 1.)) + threshold,
+            0.5*np.pi
+        ))
+        ik, js = np.nonzero(w >= (wmin - 1e-12)[:, None])
+        qeqv = quats.multiply(qk[ik], qsymm[js])
+        found = cKDTree(
+            np.vstack((qeqv, -qeqv)), balanced_tree=False
+        ).sparse_distance_matrix(tree, r, output_type='ndarray')
+        i, j = k0 + np.tile(ik, 2)[found['i']], found['j']
+        below = (found['v'] < r) & (i < j)
+        links.append((i[below], j[below]))
+
+    return links
+
+
+def grid_neighbor_pairs(shape):
+    """pairs of face neighbors on a regular grid
+
+    Parameters
+    ----------
+    shape: tuple of int
+       shape of the grid, e.g. the shape of a voxel array
+
+    Returns
+    -------
+    i, j: int arrays
+       flat indices (C order) of all pairs of cells sharing a face
+    """
+    index = np.arange(np.prod(shape)).reshape(shape)
+    i, j = [], []
+    for axis in range(len(shape)):
+        lo = [slice(None)] * len(shape)
+        hi = [slice(None)] * len(shape)
+        lo[axis], hi[axis] = slice(None, -1), slice(1, None)
+        i.append(index[tuple(lo)].ravel())
+        j.append(index[tuple(hi)].ravel())
+
+    return np.concatenate(i), np.concatenate(j)
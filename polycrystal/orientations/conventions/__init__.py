@@ -1,10 +1,13 @@
 """Orientation Conventions
 
 The primary interface here is through the `to_rmats()`, `from_rmats()` and
-`convert()` functions. To add a new convention, make a subclass of the
+`convert()` functions. Large files of orientations can be converted in chunks
+with `convert_file()`. To add a new convention, make a subclass of the
 `Convention` class in `baseclass.py`.  Add the convention name in the
 `convention` attribute. Then implement the `to_rmats()` and `from_rmats()`
 methods for that class. The convention will be automatically registered here.
+Direct conversions to or from other conventions, which avoid forming rotation
+matrices, can be registered with the `register_converter` decorator.
 
 The conventions here are not meant to be exhaustive. They are mainly for
 internal use, particularly the quaternions. The `scipy` Rotation class
@@ -20,15 +23,26 @@ See Also
 import pkgutil
 import importlib
 
-from .registry import registry
+from .registry import registry, converters, register_converter
 
 # Import all  modules that define a convention
-IGNORE = set(('registry', 'baseclass', 'conventionabc'))
+IGNORE = set(('registry', 'baseclass', 'conventionabc', 'streaming'))
 for loader, name, ispkg in pkgutil.iter_modules(__path__):
     if name not in IGNORE:
         importlib.import_module('.'+name, __package__)
 
 
+_QUATS = 'quaternions'
+_instances = dict()
+
+
+def _convention(name):
+    """return the (stateless) convention instance by name"""
+    if name not in _instances:
+        _instances[name] = registry[name]()
+    return _instances[name]
+
+
 def conventions():
     """return list of orientation conventions"""
     return list(registry.keys())
@@ -49,7 +63,7 @@ def to_rmats(orientations, convention):
     array (n, 3, 3)
        array of `n` 3x3 matrices
 """
-    return registry[convention]().to_rmats(orientations)
+    return _convention(convention).to_rmats(orientations)
 
 
 def from_rmats(rmats, convention):
@@ -67,7 +81,7 @@ def from_rmats(rmats, convention):
     array (n, m)
         array of `n` parameter `m`-vectors
     """
-    return registry[convention]().from_rmats(rmats)
+    return _convention(convention).from_rmats(rmats)
 
 
 def convert(from_ori, from_conv, to_conv):
@@ -86,5 +100,23 @@ def convert(from_ori, from_conv, to_conv):
     -------
     array (n, m2)
        array of orientation parameters in the new convention
+
+    Notes
+    -----
+    A registered direct converter is used if there is one. Otherwise, if both
+    conventions have direct converters with quaternions, the conversion goes
+    through quaternions, and if not, through rotation matrices.
 """
+    direct = converters.get((from_conv, to_conv))
+    if direct is not None:
+        return direct(from_ori)
+
+    to_q = converters.get((from_conv, _QUATS))
+    from_q = converters.get((_QUATS, to_conv))
+    if to_q is not None and from_q is not None:
+        return from_q(to_q(from_ori))
+
     return from_rmats(to_rmats(from_ori, from_conv), to_conv)
+
+
+from .streaming import convert_file
@@ -1,4 +1,6 @@
 """Base class for conventions"""
+import numpy as np
+
 from .conventionabc import ConventionABC
 from .registry import ConventionRegistry
 
@@ -9,3 +11,16 @@ class Convention(ConventionABC, metaclass=ConventionRegistry):
     # Angle units
     IN_DEGREES = 0
     IN_RADIANS = 1
+
+    _rmats_error_msg = "Rotation array has wrong shape"
+
+    @classmethod
+    def _rmats_array(cls, r):
+        """return rotation matrices as array (n, 3, 3), checking the shape"""
+        r3 = np.asarray(r)
+        if r3.ndim == 2:
+            r3 = r3.reshape((1,) + r3.shape)
+        if r3.ndim != 3 or r3.shape[1:] != (3, 3):
+            raise RuntimeError(cls._rmats_error_msg + str(r3.shape))
+
+        return r3
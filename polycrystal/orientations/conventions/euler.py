@@ -1,15 +1,19 @@
 """Euler Angles convention
 
 * Degrees is default
+* Rotation is R = Rz(phi1) Rx(Phi) Rz(phi2) for angles (phi1, Phi, phi2)
+* Conversion from matrices gives phi1, phi2 in [0, 360) and Phi in [0, 180]
 """
 import numpy as np
 
 from .baseclass import Convention
+from .registry import register_converter
 
 
 class EulerAngles(Convention):
     """Euler angles class"""
     convention = 'euler-angles'
+    SIN_ZERO = 1.0e-12
 
     def to_rmats(self, a):
         ar = np.atleast_2d(np.radians(a))
@@ -35,8 +39,69 @@ class EulerAngles(Convention):
         return rmat
 
     def from_rmats(self, r):
-        msg = (
-            "Conversion from rotation matrices not implemented for this "
-            "convention"
-        )
-        raise NotImplementedError(msg)
+        rm = self._rmats_array(r)
+
+        # With R = Rz(phi1) Rx(Phi) Rz(phi2), the third row and column give
+        # the angles unless sin(Phi) vanishes (gimbal lock). In that case,
+        # only phi1 +/- phi2 is determined, and we take phi2 = 0.
+        s_Phi = np.hypot(rm[:, 0, 2], rm[:, 1, 2])
+        a = np.empty((len(rm), 3))
+        a[:, 0] = np.arctan2(rm[:, 0, 2], -rm[:, 1, 2])
+        a[:, 1] = np.arctan2(s_Phi, rm[:, 2, 2])
+        a[:, 2] = np.arctan2(rm[:, 2, 0], rm[:, 2, 1])
+
+        locked = s_Phi < self.SIN_ZERO
+        a[locked, 0] = np.arctan2(rm[locked, 1, 0], rm[locked, 0, 0])
+        a[locked, 2] = 0.
+
+        return np.degrees(np.mod(a, 2*np.pi))
+
+
+@register_converter('euler-angles', 'quaternions')
+def _to_quaternions(a):
+    """quaternions from Euler angles, with nonnegative scalar part"""
+    ar = np.atleast_2d(np.radians(a))
+    n, d = ar.shape
+    if not d==3:
+        raise RuntimeError("Euler angles array has wrong shape")
+
+    # Rz(phi1) Rx(Phi) Rz(phi2) in terms of half angles.
+    c_Phi, s_Phi = np.cos(0.5*ar[:, 1]), np.sin(0.5*ar[:, 1])
+    a_sum = 0.5*(ar[:, 0] + ar[:, 2])
+    a_dif = 0.5*(ar[:, 0] - ar[:, 2])
+
+    q = np.empty((n, 4))
+    q[:, 0] = c_Phi*np.cos(a_sum)
+    q[:, 1] = s_Phi*np.cos(a_dif)
+    q[:, 2] = s_Phi*np.sin(a_dif)
+    q[:, 3] = c_Phi*np.sin(a_sum)
+    q[q[:, 0] < 0.] *= -1.
+
+    return q
+
+
+@register_converter('quaternions', 'euler-angles')
+def _from_quaternions(a):
+    """Euler angles from quaternions"""
+    q = np.atleast_2d(a)
+    n, d = q.shape
+    if not d==4:
+        raise RuntimeError("Quaternion array has wrong shape")
+
+    r03 = np.hypot(q[:, 0], q[:, 3])
+    r12 = np.hypot(q[:, 1], q[:, 2])
+    a_sum = np.arctan2(q[:, 3], q[:, 0])
+    a_dif = np.arctan2(q[:, 2], q[:, 1])
+
+    # At gimbal lock, one of the half angle sums is undefined; as for the
+    # conversion from matrices, take phi2 = 0.
+    locked = 2*r03*r12 < EulerAngles.SIN_ZERO
+    a_sum = np.where(locked & (r03 < r12), a_dif, a_sum)
+    a_dif = np.where(locked & (r03 >= r12), a_sum, a_dif)
+
+    ea = np.empty((n, 3))
+    ea[:, 0] = a_sum + a_dif
+    ea[:, 1] = 2.*np.arctan2(r12, r03)
+    ea[:, 2] = a_sum - a_dif
+
+    return np.degrees(np.mod(ea, 2*np.pi))
@@ -2,6 +2,8 @@
 import numpy as np
 
 from .baseclass import Convention
+from .registry import register_converter
+from ..quaternions import from_rmats
 
 
 class ExpMap(Convention):
@@ -40,8 +42,40 @@ class ExpMap(Convention):
         return I3 + c1W1 + c2W2
 
     def from_rmats(self, r):
-        msg = (
-            "Conversion from rotation matrices not implemented for this "
-            "convention"
-        )
-        raise NotImplementedError(msg)
+        return _from_quaternions(from_rmats(self._rmats_array(r)))
+
+
+@register_converter('exp-map', 'quaternions')
+def _to_quaternions(a):
+    """quaternions from exponential map, with nonnegative scalar part"""
+    w = np.atleast_2d(a)
+    n, d = w.shape
+    if not d==3:
+        raise RuntimeError("Exponential map array has wrong shape")
+
+    # sin(ang/2)/ang = sinc(ang/(2 pi))/2, which is smooth at zero.
+    ang = np.linalg.norm(w, axis=1)
+    q = np.empty((n, 4))
+    q[:, 0] = np.cos(0.5*ang)
+    q[:, 1:] = (0.5*np.sinc(ang/(2*np.pi))).reshape((n, 1)) * w
+    q[q[:, 0] < 0.] *= -1.
+
+    return q
+
+
+@register_converter('quaternions', 'exp-map')
+def _from_quaternions(a):
+    """exponential map from quaternions"""
+    q = np.atleast_2d(a)
+    n, d = q.shape
+    if not d==4:
+        raise RuntimeError("Quaternion array has wrong shape")
+
+    # The vector part of the quaternion is sin(angle/2) times the axis;
+    # the factor angle/sin(angle/2) tends to 2 for small angles.
+    sgn = np.where(q[:, 0] < 0., -1., 1.)
+    sin_a2 = np.linalg.norm(q[:, 1:], axis=1)
+    ang = 2.*np.arctan2(sin_a2, sgn*q[:, 0])
+    fac = np.divide(ang, sin_a2, out=2.*np.ones_like(ang), where=sin_a2>0)
+
+    return (sgn*fac).reshape((n, 1)) * q[:, 1:]
@@ -4,6 +4,30 @@ import abc
 
 registry = dict()
 
+# Direct conversions between conventions, keyed by (from, to) names.
+converters = dict()
+
+
+def register_converter(from_conv, to_conv):
+    """decorator to register a direct conversion between conventions
+
+    The decorated function takes an array of orientation parameters in the
+    `from_conv` convention and returns the array in the `to_conv` convention.
+    `convert()` uses it in place of conversion through rotation matrices.
+
+    Parameters
+    ----------
+    from_conv: str
+       name for the input orientation convention
+    to_conv: str
+       name of the output convention
+    """
+    def register(func):
+        converters[(from_conv, to_conv)] = func
+        return func
+
+    return register
+
 
 class ConventionRegistry(abc.ABCMeta):
     """Keep a dictionary of conventions by name"""
@@ -0,0 +1,171 @@
+"""Conversion of orientation files in chunks
+
+The `convert_file()` function converts an array of orientations stored in a
+file to another convention, one chunk of rows at a time, writing the result
+to a memory-mapped `.npy` file. The peak memory used depends on the chunk
+size, but not on the size of the file.
+
+Sources can be `.npy` files (memory-mapped), `.npz` files (each member is
+read as a stream, compressed or not), or text files readable by `np.loadtxt`.
+"""
+import itertools
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from . import convert
+
+
+DEFAULT_CHUNK_SIZE = 2**16
+
+
+def convert_file(
+        source, from_conv, to_conv, dest,
+        chunk_size=DEFAULT_CHUNK_SIZE, key=None, delimiter=None
+):
+    """convert orientations in a file between conventions, in chunks
+
+    Parameters
+    ----------
+    source: str or Path
+       name of input file, with suffix `.npy`, `.npz`, or any other suffix for
+       a text file
+    from_conv: str
+       name for the input orientation convention
+    to_conv: str
+       name of the output convention
+    dest: str or Path or array
+       name of the output `.npy` file, which is written as a memory-mapped
+       array, or a preallocated output array with the correct shape
+    chunk_size: int, default = DEFAULT_CHUNK_SIZE
+       number of rows to convert at a time
+    key: str or None, default = None
+       name of the array in a `.npz` file; if None, the file must contain a
+       single array
+    delimiter: str or None, default = None
+       delimiter for text files, passed to `np.loadtxt`
+
+    Returns
+    -------
+    array (n, m2)
+       the output array; a memory map if `dest` is a file name
+    """
+    nrows, chunks = _read_chunks(source, chunk_size, key, delimiter)
+
+    out = dest if isinstance(dest, np.ndarray) else None
+    if out is not None and (out.ndim != 2 or len(out) != nrows):
+        raise ValueError(
+            f"`dest` must have shape ({nrows}, m2), not {out.shape}"
+        )
+
+    i0 = 0
+    for chunk in chunks:
+        converted = convert(chunk, from_conv, to_conv)
+        if out is None:
+            out = np.lib.format.open_memmap(
+                dest, mode='w+', dtype=converted.dtype,
+                shape=(nrows, converted.shape[1])
+            )
+        elif i0 == 0 and out.shape[1] != converted.shape[1]:
+            raise ValueError(
+                f"`dest` must have shape {(nrows, converted.shape[1])}, "
+                f"not {out.shape}"
+            )
+        i1 = i0 + len(chunk)
+        out[i0:i1] = converted
+        i0 = i1
+
+    if out is None:
+        raise ValueError(f"no orientations found in {source}")
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    return out
+
+
+def _read_chunks(source, chunk_size, key, delimiter):
+    """return number of rows and generator of chunks of rows"""
+    suffix = Path(source).suffix
+    if suffix == '.npy':
+        return _npy_chunks(source, chunk_size)
+    elif suffix == '.npz':
+        return _npz_chunks(source, chunk_size, key)
+    else:
+        return _text_chunks(source, chunk_size, delimiter)
+
+
+def _npy_chunks(source, chunk_size):
+    """chunks of memory-mapped .npy file"""
+    a = np.load(source, mmap_mode='r')
+    _check_2d(a.shape, source)
+
+    chunks = (
+        np.asarray(a[i0:i0 + chunk_size])
+        for i0 in range(0, len(a), chunk_size)
+    )
+    return len(a), chunks
+
+
+def _npz_chunks(source, chunk_size, key):
+    """chunks of .npz file member, read as a stream"""
+    with zipfile.ZipFile(source) as zf:
+        names = zf.namelist()
+    if key is None:
+        if len(names) != 1:
+            raise ValueError(f"`key` must be given for {source}")
+        member = names[0]
+    else:
+        member = key + '.npy'
+        if member not in names:
+            raise KeyError(f"{key!r} is not in {source}")
+
+    with zipfile.ZipFile(source) as zf, zf.open(member) as f:
+        shape, fortran_order, dtype = _read_header(f)
+    _check_2d(shape, source)
+    if fortran_order:
+        raise ValueError(f"cannot stream Fortran-ordered array in {source}")
+
+    def chunks():
+        row_bytes = shape[1] * dtype.itemsize
+        with zipfile.ZipFile(source) as zf, zf.open(member) as f:
+            _read_header(f)
+            for i0 in range(0, shape[0], chunk_size):
+                nr = min(chunk_size, shape[0] - i0)
+                buf = f.read(nr * row_bytes)
+                yield np.frombuffer(buf, dtype=dtype).reshape(nr, shape[1])
+
+    return shape[0], chunks()
+
+
+def _read_header(f):
+    """read .npy header from open file, returning shape, order and dtype"""
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    else:
+        return np.lib.format.read_array_header_2_0(f)
+
+
+def _text_chunks(source, chunk_size, delimiter):
+    """chunks of text file; the file is read once to count the rows"""
+    with open(source) as f:
+        nrows = sum(1 for line in f if _is_data(line))
+
+    def chunks():
+        with open(source) as f:
+            lines = filter(_is_data, f)
+            while chunk := list(itertools.islice(lines, chunk_size)):
+                yield np.loadtxt(chunk, delimiter=delimiter, ndmin=2)
+
+    return nrows, chunks()
+
+
+def _is_data(line):
+    """True if line of text has data, i.e. is not blank or a comment"""
+    return bool(line.split('#', 1)[0].strip())
+
+
+def _check_2d(shape, source):
+    if len(shape) != 2:
+        raise ValueError(f"orientation array in {source} must be 2D")
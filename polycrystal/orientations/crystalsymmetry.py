@@ -9,6 +9,11 @@ import numpy as np
 from . import quaternions as quats
 
 
+# Number of orientations processed at a time by the batched methods; this
+# bounds the size of temporary (chunk_size, nsymm) arrays.
+DEFAULT_CHUNK_SIZE = 2**16
+
+
 def list_symmetries():
     """List available symmetry groups"""
     return _Registry.registry.keys()
@@ -19,6 +24,12 @@ def get_symmetries(name):
     return _Registry.get(name)
 
 
+def _readonly(a):
+    """flag array as non-writeable and return it"""
+    a.setflags(write=False)
+    return a
+
+
 class CrystalSymmetry(object):
     """Base class for crystal symmetry types
 
@@ -32,8 +43,20 @@ class CrystalSymmetry(object):
 
     def __init__(self, name, qsymm):
         self._name = name
-        self._q = qsymm
-        self._rmats = quats.to_rmats(qsymm)
+        self._q = _readonly(np.array(qsymm, dtype=float))
+        self._rmats = _readonly(quats.to_rmats(self._q))
+        # The scalar part of q*s is the dot product of q with the conjugate
+        # of s, so the scalar parts for all symmetries are a matrix product.
+        self._qconj_t = quats.inverse(self._q).T.copy()
+        # Copies for float32 inputs, so that products are not upcast.
+        self._tables = {
+            np.dtype(np.float64): (self._q, self._qconj_t),
+            np.dtype(np.float32): (
+                self._q.astype(np.float32), self._qconj_t.astype(np.float32)
+            ),
+        }
+        self._ident = int(np.abs(self._q[:, 0]).argmax())
+        self._mult_table, self._inv_table = self._group_tables()
         _Registry.register(name, self)
 
     @property
@@ -43,26 +66,73 @@ class CrystalSymmetry(object):
 
     @property
     def quats(self):
-        """return quaternions of symmetry group"""
-        return self._q.copy()
+        """quaternions of symmetry group (read-only)"""
+        return self._q
 
     @property
     def rmats(self):
-        """return rotation matrices of symmetry group"""
-        return self._rmats.copy()
+        """rotation matrices of symmetry group (read-only)"""
+        return self._rmats
 
     @property
     def nsymm(self):
         """number of symmetries in group"""
         return len(self._q)
 
-    def to_fundamental_region(self, q):
+    @property
+    def multiplication_table(self):
+        """group multiplication table (read-only)
+
+        Entry (i, j) is the index of the symmetry s_i * s_j, so that symmetry
+        operators can be composed by index.
+        """
+        return self._mult_table
+
+    @property
+    def inverse_table(self):
+        """index of the inverse of each symmetry (read-only)"""
+        return self._inv_table
+
+    def compose(self, i, j):
+        """index of composition of symmetries
+
+        Parameters
+        ----------
+        i, j: int or int array
+           indices of symmetries; arrays must have broadcastable shapes
+
+        Returns
+        -------
+        int or int array
+           index of the symmetry s_i * s_j
+        """
+        return self._mult_table[i, j]
+
+    def _group_tables(self):
+        """Compute group multiplication and inverse tables"""
+        EPS = 1e-8
+        ns = self.nsymm
+        prod = quats.outer_multiply(self._q, self._q).reshape(ns*ns, 4)
+        # Quaternions q and -q are the same rotation.
+        dots = np.abs(prod @ self._q.T)
+        mult = dots.argmax(axis=1)
+        if np.any(dots[np.arange(ns*ns), mult] < 1. - EPS):
+            raise ValueError(f"symmetries for {self.name!r} are not a group")
+        mult = mult.reshape(ns, ns)
+
+        inv = (mult == self._ident).argmax(axis=1)
+
+        return _readonly(mult), _readonly(inv)
+
+    def to_fundamental_region(self, q, chunk_size=DEFAULT_CHUNK_SIZE):
         """find equivalent quaternions in the fundamental region
 
         Parameters
         ----------
         q: array (n, 4)
            an array of `n` quaternions
+        chunk_size: int, default = DEFAULT_CHUNK_SIZE
+           number of quaternions to process at a time
 
         Returns
         -------
@@ -71,18 +141,53 @@ class CrystalSymmetry(object):
         """
 
         # * apply crystal symmetries on right for convention: Rc=s
+        # * choose the equivalent with the largest scalar part
         # * enforce scalar part of quaternion nonnegative
 
-        qfr = np.zeros_like(q)
-        for i in range(len(q)):
-            qeqv = quats.multiply(q[i], self._q)
-            j = np.abs(qeqv[:, 0]).argmax()
-            qfr[i] = qeqv[j]
-            if qfr[i, 0] < 0.:
-                qfr[i] = -qfr[i]
+        q = np.atleast_2d(q)
+        qfr = np.empty_like(q, dtype=quats._float_dtype(q))
+        for i0 in range(0, len(q), chunk_size):
+            i1 = i0 + chunk_size
+            self._to_fundamental_region(q[i0:i1], qfr[i0:i1])
+
+        return qfr
+
+    def _to_fundamental_region(self, q, out):
+        """reduce a single chunk of quaternions to the fundamental region"""
+        # Only the scalar parts are needed to select the symmetry, so the full
+        # product is formed for the selected symmetry only.
+        qsymm, qconj_t = self._symmetry_tables(out.dtype)
+        scalars = q @ qconj_t
+        j = np.abs(scalars).argmax(axis=1)
+        qfr = quats.multiply(q, qsymm[j], out=out)
+        qfr[qfr[:, 0] < 0.] *= -1.
 
         return qfr
 
+    def _symmetry_tables(self, dtype):
+        """symmetry quaternions and transposed conjugates for a dtype"""
+        return self._tables.get(np.dtype(dtype), self._tables[np.dtype(float)])
+
+    def in_fundamental_region(self, q):
+        """check which quaternions are in the fundamental region
+
+        Parameters
+        ----------
+        q: array (n, 4)
+           an array of `n` quaternions
+
+        Returns
+        -------
+        bool array (n)
+           True where `q`, or `-q`, is the equivalent chosen by
+           `to_fundamental_region`
+        """
+        q = np.atleast_2d(q)
+        _, qconj_t = self._symmetry_tables(q.dtype)
+        j = np.abs(q @ qconj_t).argmax(axis=1)
+
+        return j == self._ident
+
     def average_orientation(self, q):
         """average orientation of clustered group of orientations
 
@@ -98,14 +203,73 @@ class CrystalSymmetry(object):
            to group them)
         """
         q0 = q[0].copy()
-        qtmp = quats.multiply(quats.inverse(q0), q)
+        qtmp = quats.conjugate_multiply(q0, q)
         qtmp = self.to_fundamental_region(qtmp)
-        qtmpavg = qtmp.mean(axis=0)
+        qtmpavg = qtmp.mean(axis=0, dtype=float)
         qtmpavg = qtmpavg/np.linalg.norm(qtmpavg)
-        qavg = quats.multiply(q0, qtmpavg)
+        qavg = quats.multiply(q0, qtmpavg.astype(qtmp.dtype))
 
         return self.to_fundamental_region(qavg)
 
+    def average_orientations(self, q, labels, method='mean'):
+        """average orientations of many groups at once
+
+        Parameters
+        ----------
+        q: array (n, 4)
+           an array of `n` quaternions
+        labels: int array (n)
+           group label of each orientation, e.g. grain ID
+        method: str, default = 'mean'
+           'mean' for the normalized mean quaternion, as in
+           `average_orientation`; 'markley' for the eigenvector of the largest
+           eigenvalue of the sum of q q^T, which is more accurate for large
+           spreads of orientations
+
+        Returns
+        -------
+        labels: int array (m)
+           the distinct labels, in increasing order
+        array (m, 4):
+           the average orientation of each group
+        """
+        q = np.atleast_2d(q)
+        ulabels, first, group = np.unique(
+            labels, return_index=True, return_inverse=True
+        )
+        group = group.ravel()
+        m = len(ulabels)
+
+        # As for a single group, the orientations are brought together by
+        # taking them relative to the first one in the group.
+        q0 = q[first]
+        qtmp = self.to_fundamental_region(
+            quats.conjugate_multiply(q0[group], q, normalize=False)
+        )
+
+        if method == 'mean':
+            # Without any weights, e.g. for no orientations, the counts are
+            # integers.
+            qtmpavg = np.stack([
+                np.bincount(group, weights=qtmp[:, k], minlength=m)
+                for k in range(4)
+            ], axis=1).astype(float, copy=False)
+            quats._normalize(qtmpavg)
+        elif method == 'markley':
+            qqt = np.empty((m, 4, 4))
+            for a in range(4):
+                for b in range(a, 4):
+                    qqt[:, a, b] = qqt[:, b, a] = np.bincount(
+                        group, weights=qtmp[:, a]*qtmp[:, b], minlength=m
+                    )
+            qtmpavg = np.linalg.eigh(qqt)[1][:, :, -1]
+        else:
+            raise ValueError(f"unknown averaging method: {method!r}")
+
+        qavg = quats.multiply(q0, qtmpavg.astype(qtmp.dtype))
+
+        return ulabels, self.to_fundamental_region(qavg)
+
     def misorientation(self, q1, q2):
         """misorientation between crystals
 
@@ -120,7 +284,7 @@ class CrystalSymmetry(object):
         array (n, 4):
            the misorientation quaternion (taking q1 to q2) of smallest angle
         """
-        qmis = quats.multiply(quats.inverse(q1), q2)
+        qmis = quats.conjugate_multiply(q1, q2)
         return self.to_fundamental_region(qmis)
 
     def misorientation_angle(self, q1, q2):
@@ -139,8 +303,147 @@ class CrystalSymmetry(object):
         """
         return 2.0*np.arccos(self.misorientation(q1, q2)[:, 0])
 
+    def disorientation(
+            self, q1, q2, brute_force=False, chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        """disorientation between crystals
+
+        Parameters
+        ----------
+        q1, q2: array (n, 4)
+           arrays of `n` quaternions; either can be a single quaternion, but
+           if neither are, they must be of the same length
+        brute_force: bool, default = False
+           if True, search all combinations of symmetries on both sides and
+           the switching symmetry; otherwise, use the closed form kernel for
+           the symmetry group, if it has one
+        chunk_size: int, default = DEFAULT_CHUNK_SIZE
+           number of misorientations to process at a time
+
+        Returns
+        -------
+        array (n, 4):
+           the misorientation quaternion of smallest angle, with nonnegative
+           scalar part, chosen among all equivalents under crystal symmetries
+           applied to both crystals and interchange of the crystals; of those,
+           the one with the lexicographically largest axis components is
+           chosen, e.g. x >= y >= z >= 0 for cubic symmetry
+
+        Notes
+        -----
+        The misorientation angle does not depend on the symmetry on the left,
+        so `misorientation_angle` gives the same angle; the disorientation
+        further reduces the axis to the fundamental zone. For the cubic and
+        hexagonal groups, this is done in closed form without searching the
+        2*nsymm**2 equivalent quaternions.
+        """
+        qmis = quats.conjugate_multiply(q1, q2)
+        kernel = _disorientation_kernels.get(self.name)
+        if brute_force or kernel is None:
+            kernel = self._disorientation_brute_force
+            chunk_size = max(1, chunk_size // (2 * self.nsymm**2))
+
+        qdis = np.empty_like(qmis)
+        for i0 in range(0, len(qmis), chunk_size):
+            i1 = i0 + chunk_size
+            qdis[i0:i1] = kernel(qmis[i0:i1])
+
+        return qdis
+
+    def _disorientation_brute_force(self, qmis):
+        """disorientation by search of all equivalent misorientations"""
+        EPS = 1e-10
+        n = len(qmis)
+        qsw = np.stack((qmis, quats.inverse(qmis)), axis=1)
+        qcand = quats.conjugate_multiply(
+            self._q[None, None, :, None, :],
+            quats.multiply(qsw[:, :, None, :], self._q)[:, :, None, :, :]
+        ).reshape(n, -1, 4)
+        qcand[qcand[:, :, 0] < 0.] *= -1.
+
+        # Largest scalar part, then lexicographically largest axis.
+        best = np.ones(qcand.shape[:2], dtype=bool)
+        for k in range(4):
+            ck = np.where(best, qcand[:, :, k], -np.inf)
+            best &= (ck >= ck.max(axis=1, keepdims=True) - EPS)
+
+        return qcand[np.arange(n), best.argmax(axis=1)]
+
+    def pair_misorientations(
+            self, q, i, j, chunk_size=DEFAULT_CHUNK_SIZE,
+            angles=None, axes=None
+    ):
+        """misorientations between pairs of crystals in an orientation table
+
+        Parameters
+        ----------
+        q: array (n, 4)
+           table of `n` quaternions
+        i, j: int arrays (m)
+           indices into `q` of the `m` pairs; the misorientation of each pair
+           takes q[i] to q[j]
+        chunk_size: int, default = DEFAULT_CHUNK_SIZE
+           number of pairs to process at a time
+        angles: array (m) or None, default = None
+           output array for the angles, e.g. a preallocated or memory-mapped
+           array; if None, a new array is allocated
+        axes: array (m, 3) or None, default = None
+           output array for the axes; if None, a new array is allocated
+
+        Returns
+        -------
+        angles: array (m)
+           the angle of the smallest misorientation for each pair
+        axes: array (m, 3)
+           the unit axis of the smallest misorientation; for zero angles, the
+           axis is set to (1, 0, 0)
+
+        Notes
+        -----
+        Only one chunk of the operands is gathered from `q` at a time, so the
+        memory used is bounded by `chunk_size` rather than the number of pairs.
+        """
+        i, j = np.asarray(i), np.asarray(j)
+        if i.shape != j.shape or i.ndim != 1:
+            raise ValueError("pair indices must be 1D arrays of same length")
+
+        m = len(i)
+        dtype = quats._float_dtype(q)
+        if angles is None:
+            angles = np.empty(m, dtype=dtype)
+        elif np.shape(angles) != (m,):
+            raise ValueError(
+                f"`angles` must have shape {(m,)}, not {np.shape(angles)}"
+            )
+        if axes is None:
+            axes = np.empty((m, 3), dtype=dtype)
+        elif np.shape(axes) != (m, 3):
+            raise ValueError(
+                f"`axes` must have shape {(m, 3)}, not {np.shape(axes)}"
+            )
+
+        # Work buffers are reused for every chunk.
+        mbuf = min(m, chunk_size)
+        qbuf = np.empty((mbuf, 4), dtype=dtype)
+        qfr = np.empty((mbuf, 4), dtype=dtype)
+        for k0 in range(0, m, chunk_size):
+            k1 = min(k0 + chunk_size, m)
+            qmis = quats.conjugate_multiply(
+                q[i[k0:k1]], q[j[k0:k1]], out=qbuf[:k1 - k0], normalize=False
+            )
+            qmis = self._to_fundamental_region(qmis, qfr[:k1 - k0])
+            vnrm = np.linalg.norm(qmis[:, 1:], axis=1)
+            angles[k0:k1] = 2.0*np.arctan2(vnrm, qmis[:, 0])
+            zero = (vnrm == 0.)
+            vnrm[zero] = 1.
+            qmis[zero, 1:] = (1., 0., 0.)
+            axes[k0:k1] = qmis[:, 1:]/vnrm[:, None]
+
+        return angles, axes
+
     pass  # end class
 
+
 # ==================== Registry
 
 
@@ -260,3 +563,73 @@ _qcubic = 1.0*np.array([
     [0,     0,   -_s2,    _s2]
 ])
 _cubic = CrystalSymmetry('cubic', _qcubic)
+
+
+# ==================== Disorientation kernels
+#
+# These reduce misorientations to the disorientation in closed form. See
+# `CrystalSymmetry.disorientation`.
+
+
+def _cubic_disorientation(q):
+    """cubic disorientation from sorted magnitudes of components"""
+    # With a >= b >= c >= d the sorted magnitudes of the components, the
+    # scalar parts of the 24 equivalents are (up to sign) the single
+    # components, (+/- pairs)/sqrt(2), and (+/- all four)/2. The largest of
+    # each kind is a, (a + b)/sqrt(2), (a + b + c + d)/2. Symmetries on both
+    # sides and switching act on the axis by all signed permutations, so the
+    # axis is reduced by sorting the magnitudes of its components.
+    a, b, c, d = np.sort(np.abs(q), axis=1)[:, ::-1].T
+
+    qdis = np.empty_like(q)
+    one = np.stack((a, b, c, d), axis=1)
+    two = np.stack((a + b, a - b, c + d, c - d), axis=1)*_s2
+    two[:, 1:] = np.sort(two[:, 1:], axis=1)[:, ::-1]
+    three = 0.5*np.stack((
+        a + b + c + d, a + b - c - d, a - b + c - d, np.abs(a - b - c + d)
+    ), axis=1)
+
+    case = np.stack((one[:, 0], two[:, 0], three[:, 0]), axis=1).argmax(1)
+    for k, qk in enumerate((one, two, three)):
+        qdis[case == k] = qk[case == k]
+
+    return qdis
+
+
+def _hexagonal_disorientation(q):
+    """hexagonal disorientation from angles of component pairs"""
+    # The scalar parts of the equivalents are (q0, q3) projected on directions
+    # at multiples of 30 degrees for the c-axis rotations, and (q1, q2) for
+    # the binary rotations, so the best symmetry of each kind comes from the
+    # nearest multiple of 30 degrees to the angle of the pair.
+    alpha = np.arctan2(q[:, 3], q[:, 0])
+    beta = np.arctan2(q[:, 2], q[:, 1])
+    k_c = np.round(alpha/_p6)
+    k_b = np.round(beta/_p6)
+    s_c = np.hypot(q[:, 0], q[:, 3])*np.cos(alpha - k_c*_p6)
+    s_b = np.hypot(q[:, 1], q[:, 2])*np.cos(beta - k_b*_p6)
+
+    isym = np.where(
+        np.abs(s_c) >= np.abs(s_b),
+        (-k_c) % 6,
+        6 + k_b % 6
+    ).astype(int)
+    qfr = quats.multiply(q, _qhex[isym])
+    qfr[qfr[:, 0] < 0.] *= -1.
+
+    # Symmetries on both sides and switching act on the axis by rotations of
+    # 60 degrees about c, reflections through the a-axes and sign of z.
+    rho = np.hypot(qfr[:, 1], qfr[:, 2])
+    phi = np.mod(np.arctan2(qfr[:, 2], qfr[:, 1]), 2*_p6)
+    phi = np.minimum(phi, 2*_p6 - phi)
+    qfr[:, 1] = rho*np.cos(phi)
+    qfr[:, 2] = rho*np.sin(phi)
+    qfr[:, 3] = np.abs(qfr[:, 3])
+
+    return qfr
+
+
+_disorientation_kernels = {
+    'cubic': _cubic_disorientation,
+    'hexagonal': _hexagonal_disorientation,
+}
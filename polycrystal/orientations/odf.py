@@ -0,0 +1,190 @@
+"""Orientation distribution functions
+
+The `KernelODF` class estimates an orientation distribution function (ODF)
+from a set of orientations, e.g. measured grain or pixel orientations, as a
+sum of kernels centered on the orientations. It uses the de la Vallee Poussin
+kernel, which has a closed form normalization,
+
+   K(omega) = C cos(omega/2)^(2 kappa)
+
+where `omega` is the misorientation angle and `kappa` is set by the kernel
+halfwidth. The ODF is in multiples of random distribution (MRD), so its mean
+over all orientations is 1.
+
+Notes
+-----
+The kernel is negligible beyond a cutoff angle, so each orientation only
+contributes to the symmetric equivalents of evaluation points within the
+cutoff. These are found with an `OrientationIndex` of the evaluation points,
+and the orientations are processed in chunks, so the cost grows linearly with
+the number of orientations and evaluation points, instead of as their
+product, and the memory used does not depend on the number of orientations.
+For very large numbers of orientations, they can also be combined in bins
+first.
+"""
+import numpy as np
+from scipy.special import gammaln
+
+from . import quaternions as quats
+from .orientation_index import OrientationIndex
+
+
+DEFAULT_PAIR_CHUNK = 2**20
+
+
+class KernelODF:
+    """Kernel density estimate of an orientation distribution function
+
+    Parameters
+    ----------
+    q: array (n, 4)
+       array of `n` orientations as unit quaternions
+    csym: CrystalSymmetry
+       crystal symmetry group
+    halfwidth: float
+       angle (radians) at which the kernel is half of its maximum
+    weights: array (n) or None, default = None
+       weights of the orientations, e.g. grain volumes; if None, all
+       orientations have the same weight
+    tol: float, default = 1e-4
+       kernel values less than `tol` times the maximum are neglected
+    resolution: float or None, default = None
+       if given, orientations within bins of about this angular size
+       (radians) are combined into their weighted mean before evaluation,
+       so that the cost of evaluation depends on the number of bins rather
+       than the number of orientations; a resolution of a quarter of the
+       halfwidth or less changes the ODF little
+
+    Attributes
+    ----------
+    q: array (n, 4)
+       the orientations, or bin means, at the kernel centers
+    weights: array (n)
+       the weights of the kernels
+    """
+
+    def __init__(
+            self, q, csym, halfwidth, weights=None, tol=1e-4, resolution=None
+    ):
+        q = np.atleast_2d(q)
+        self.csym = csym
+        if not 0. < halfwidth < np.pi:
+            raise ValueError("halfwidth must be between 0 and pi")
+        self.halfwidth = halfwidth
+        if weights is None:
+            weights = np.ones(len(q))
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != (len(q),):
+            raise ValueError("weights must have one value per orientation")
+        self.tol = tol
+
+        if resolution is None:
+            self.q, self.weights = q, weights
+        else:
+            self.q, self.weights = self._bin(q, weights, resolution)
+
+    def _bin(self, q, weights, resolution):
+        """weighted means and total weights of orientations in bins"""
+        # Bins are cells of a cubic lattice in quaternion space, for
+        # quaternions in the fundamental region; the chordal distance is
+        # about half the angle.
+        qfr = self.csym.to_fundamental_region(q)
+        cells = np.floor(qfr/(0.5*resolution)).astype(np.int64)
+        cells -= cells.min(axis=0)
+        base = int(cells.max()) + 1
+        if base**4 <= np.iinfo(np.int64).max:
+            # Integer keys are faster to sort than rows.
+            keys = cells @ base**np.arange(4, dtype=np.int64)
+            _, group = np.unique(keys, return_inverse=True)
+        else:
+            _, group = np.unique(cells, axis=0, return_inverse=True)
+        group = group.ravel()
+
+        nbins = group.max() + 1
+        wbin = np.bincount(group, weights=weights, minlength=nbins)
+        qbin = np.stack([
+            np.bincount(group, weights=weights*qfr[:, k], minlength=nbins)
+            for k in range(4)
+        ], axis=1)
+        keep = wbin > 0.
+        qbin = qbin[keep]
+
+        return quats._normalize(qbin), wbin[keep]
+
+    @property
+    def kappa(self):
+        """kernel exponent for the halfwidth"""
+        return np.log(0.5)/(2.*np.log(np.cos(0.5*self.halfwidth)))
+
+    @property
+    def cutoff(self):
+        """angle beyond which the kernel is neglected"""
+        c = self.tol**(0.5/self.kappa)
+        return 2.*np.arccos(c)
+
+    @property
+    def _log_normalization(self):
+        """log of the constant C normalizing the kernel to mean 1"""
+        k = self.kappa
+        return 0.5*np.log(np.pi) + gammaln(k + 2.) - gammaln(k + 0.5)
+
+    def kernel(self, omega):
+        """kernel value for misorientation angles
+
+        Parameters
+        ----------
+        omega: array
+           misorientation angles (radians)
+
+        Returns
+        -------
+        array
+           kernel values, in MRD for a single orientation without symmetry
+        """
+        return self._kernel_of_scalar(np.cos(0.5*np.asarray(omega)))
+
+    def _kernel_of_scalar(self, c):
+        """kernel value from magnitudes of misorientation scalar parts"""
+        with np.errstate(divide='ignore'):
+            logk = 2.*self.kappa*np.log(np.abs(c))
+        return np.exp(logk + self._log_normalization)
+
+    def evaluate(self, g, chunk_size=DEFAULT_PAIR_CHUNK):
+        """evaluate the ODF at given orientations
+
+        Parameters
+        ----------
+        g: array (m, 4)
+           array of `m` orientations at which to evaluate the ODF
+        chunk_size: int, default = DEFAULT_PAIR_CHUNK
+           approximate number of pairs of orientations and evaluation points
+           to process at a time
+
+        Returns
+        -------
+        array (m)
+           ODF values in multiples of random distribution
+        """
+        g = np.atleast_2d(g)
+        index = OrientationIndex(g, self.csym)
+
+        # The number of orientations per chunk is adjusted so that each
+        # chunk has about `chunk_size` pairs within the cutoff.
+        f = np.zeros(len(g))
+        k0, nk = 0, min(len(self.q), _FIRST_CHUNK)
+        while k0 < len(self.q):
+            k1 = min(k0 + nk, len(self.q))
+            i, j, chord = index.query_pairs(self.q[k0:k1], self.cutoff)
+            # Each pair is one symmetric equivalent, and the scalar part of
+            # the misorientation is cos(angle/2) = 1 - chord**2/2.
+            kval = self._kernel_of_scalar(1. - 0.5*chord**2)
+            f += np.bincount(
+                j, weights=self.weights[k0 + i]*kval, minlength=len(g)
+            )
+            nk = max(1, int(chunk_size*(k1 - k0)/max(len(i), 1)))
+            k0 = k1
+
+        return f/(self.csym.nsymm*self.weights.sum())
+
+
+_FIRST_CHUNK = 256
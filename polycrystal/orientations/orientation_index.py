@@ -0,0 +1,194 @@
+"""Spatial index for nearest orientation queries
+
+The `OrientationIndex` class answers k-nearest and radius queries against a
+library of reference orientations, using the misorientation angle reduced by
+crystal symmetry as the distance.
+
+Notes
+-----
+Each reference orientation is stored in a KD-tree as its `nsymm` symmetric
+equivalents and their negatives, since q and -q are the same rotation; this
+uses 2*nsymm*4 floats per reference orientation. For unit quaternions p and q,
+the chordal distance d = |p - q| is related to the angle between them by
+d = 2 sin(angle/4), so nearest neighbors in the tree are nearest in angle.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from . import quaternions as quats
+
+
+class OrientationIndex:
+    """Spatial index for nearest orientation queries
+
+    Parameters
+    ----------
+    q: array (n, 4)
+       array of `n` reference orientations as unit quaternions
+    csym: CrystalSymmetry
+       crystal symmetry group of the reference and query orientations
+
+    Attributes
+    ----------
+    n: int
+       number of reference orientations
+    """
+
+    def __init__(self, q, csym):
+        self.csym = csym
+        q = np.atleast_2d(q)
+        self.n = len(q)
+
+        qeqv = quats.outer_multiply(q, csym.quats)
+        self._ncopy = 2*csym.nsymm
+        self._tree = cKDTree(
+            np.hstack((qeqv, -qeqv)).reshape(-1, 4), balanced_tree=False
+        )
+
+    def query(self, q, k=1, workers=1):
+        """find nearest reference orientations
+
+        Parameters
+        ----------
+        q: array (m, 4)
+           array of `m` query orientations
+        k: int, default = 1
+           number of neighbors to find
+        workers: int, default = 1
+           number of workers for the KD-tree queries; -1 uses all processors
+
+        Returns
+        -------
+        angles: array (m, k)
+           misorientation angles to the nearest reference orientations, in
+           increasing order; if there are fewer than `k` references, the
+           extra angles are `inf`
+        indices: int array (m, k)
+           indices of the nearest reference orientations; missing neighbors
+           have index `n`
+        """
+        q = np.atleast_2d(q)
+        m = len(q)
+        angles = np.full((m, k), np.inf)
+        indices = np.full((m, k), self.n)
+
+        # Query increasing numbers of equivalents until `k` distinct reference
+        # orientations are found for every query.
+        ntree = self._tree.n
+        kq = min(k, ntree)
+        todo = np.arange(m)
+        while len(todo) > 0:
+            d, ref, nfound = self._query_refs(q[todo], k, kq, workers)
+            done = (nfound >= k) | (kq == ntree)
+            angles[todo[done]] = _chord_to_angle(d[done])
+            indices[todo[done]] = ref[done]
+            todo = todo[~done]
+            kq = min(2*kq, ntree)
+
+        return angles, indices
+
+    def _query_refs(self, q, k, kq, workers):
+        """k nearest distinct references among kq nearest equivalents"""
+        m = len(q)
+        d, idx = self._tree.query(
+            q, k=[kq] if kq == 1 else kq, workers=workers
+        )
+        ref = idx // self._ncopy
+
+        # Equivalents closer than `dmax` have all been found.
+        dmax = d[:, -1].copy()
+        if kq == self._tree.n:
+            dmax[:] = np.inf
+
+        # Keep the first (closest) occurrence of each reference.
+        rorder = np.argsort(ref, axis=1, kind='stable')
+        rsort = np.take_along_axis(ref, rorder, axis=1)
+        first = np.ones_like(rsort, dtype=bool)
+        first[:, 1:] = rsort[:, 1:] != rsort[:, :-1]
+        keep = np.empty_like(first)
+        np.put_along_axis(keep, rorder, first, axis=1)
+        keep &= (d <= dmax[:, None])
+        nfound = keep.sum(axis=1)
+
+        # Move kept entries to the front, preserving order by distance.
+        front = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+        d_k = np.full((m, k), np.inf)
+        ref_k = np.full((m, k), self.n)
+        ncol = front.shape[1]
+        valid = np.take_along_axis(keep, front, axis=1)
+        d_k[:, :ncol] = np.where(
+            valid, np.take_along_axis(d, front, axis=1), np.inf
+        )
+        ref_k[:, :ncol] = np.where(
+            valid, np.take_along_axis(ref, front, axis=1), self.n
+        )
+
+        return d_k, ref_k, nfound
+
+    def query_radius(self, q, angle, workers=1):
+        """find reference orientations within a misorientation angle
+
+        Parameters
+        ----------
+        q: array (m, 4)
+           array of `m` query orientations
+        angle: float
+           misorientation angle (radians)
+        workers: int, default = 1
+           number of workers for the KD-tree queries; -1 uses all processors
+
+        Returns
+        -------
+        list of int arrays
+           for each query orientation, the sorted indices of the reference
+           orientations within `angle`
+        """
+        q = np.atleast_2d(q)
+        r = 2.0*np.sin(0.25*np.minimum(angle, np.pi))
+        hits = self._tree.query_ball_point(q, r, workers=workers)
+
+        return [np.unique(np.array(h, dtype=int) // self._ncopy) for h in hits]
+
+    def query_pairs(self, q, angle):
+        """find all symmetric equivalents within a misorientation angle
+
+        Parameters
+        ----------
+        q: array (m, 4)
+           array of `m` query orientations
+        angle: float
+           misorientation angle (radians), less than pi
+
+        Returns
+        -------
+        i: int array (p)
+           indices of the query orientations
+        j: int array (p)
+           indices of the reference orientations
+        chords: array (p)
+           chordal distances |q - r| of the quaternions, where `r` is the
+           equivalent of the reference orientation; the angle is
+           4 arcsin(chord/2)
+
+        Notes
+        -----
+        Unlike `query_radius`, there is one pair for each symmetric equivalent
+        of a reference orientation within `angle`, so a reference can occur
+        more than once for a query when `angle` is large. Results are computed
+        without Python loops over the queries.
+        """
+        q = np.atleast_2d(q)
+        r = 2.0*np.sin(0.25*np.minimum(angle, np.pi))
+        qtree = cKDTree(q, balanced_tree=False)
+        pairs = qtree.sparse_distance_matrix(
+            self._tree, r, output_type='ndarray'
+        )
+
+        return pairs['i'], pairs['j'] // self._ncopy, pairs['v']
+
+
+def _chord_to_angle(d):
+    """misorientation angle from chordal distance of quaternions"""
+    with np.errstate(invalid='ignore'):
+        ang = 4.0*np.arcsin(np.minimum(0.5*d, 1.0))
+    return np.where(np.isinf(d), np.inf, ang)
@@ -0,0 +1,230 @@
+"""Pole figures and inverse pole figures
+
+Pole figures are histograms, on an equal-area (Lambert) projection of the
+upper hemisphere, of the sample directions of a crystal direction for a set of
+orientations, including all of its symmetric equivalents. Inverse pole figures
+are the same for the crystal directions of a sample direction. Orientations
+are rotation matrices taking crystal to sample components, as in the
+`orientation_list` of a microstructure, and can be weighted, e.g. by grain
+volume.
+
+The `PoleFigure` class accumulates a histogram. Its `add()` method can be
+called repeatedly with chunks of poles, so that any number of poles can be
+binned with bounded memory; the `pole_figure()` and `inverse_pole_figure()`
+functions do this for an array of orientations.
+"""
+import numpy as np
+
+
+DEFAULT_CHUNK_SIZE = 2**20
+
+DEFAULT_NBINS = 64
+
+
+def equal_area_projection(v):
+    """project directions to the unit disk by Lambert equal-area projection
+
+    Parameters
+    ----------
+    v: array (n, 3)
+       array of unit vectors; `v` and `-v` are taken to be the same direction,
+       and projected from the upper hemisphere
+
+    Returns
+    -------
+    array (n, 2)
+       points in the unit disk; equal areas on the hemisphere map to equal
+       areas of the disk
+    """
+    v = np.atleast_2d(v)
+    return np.stack(_project(v[:, 0], v[:, 1], v[:, 2]), axis=1)
+
+
+def _project(x, y, z):
+    """equal-area projection of direction components"""
+    # For z >= 0, (x, y)/sqrt(1 + z) has radius sqrt(1 - z) <= 1; for z < 0,
+    # the opposite direction is projected.
+    scale = np.copysign(1./np.sqrt(1. + np.abs(z)), z)
+    return x*scale, y*scale
+
+
+class PoleFigure:
+    """Histogram of directions on the equal-area projection
+
+    Parameters
+    ----------
+    nbins: int, default = DEFAULT_NBINS
+       number of bins in each of x and y on the square [-1, 1] x [-1, 1]
+       containing the projection disk
+
+    Attributes
+    ----------
+    counts: array (nbins, nbins)
+       total weight of the directions in each bin, indexed by (x, y) bin
+    total: float
+       total weight of all directions added
+    """
+
+    def __init__(self, nbins=DEFAULT_NBINS):
+        self.nbins = nbins
+        self.counts = np.zeros((nbins, nbins))
+        self.total = 0.
+
+    @property
+    def edges(self):
+        """bin edges in x and y"""
+        return np.linspace(-1., 1., self.nbins + 1)
+
+    @property
+    def centers(self):
+        """bin centers in x and y"""
+        e = self.edges
+        return 0.5*(e[:-1] + e[1:])
+
+    @property
+    def density(self):
+        """density in multiples of random distribution
+
+        Bins with centers outside the unit disk are NaN; bins crossing the
+        boundary of the disk are only partly covered, so their densities are
+        underestimated.
+        """
+        cell_area = (2./self.nbins)**2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dens = self.counts*np.pi/(self.total*cell_area)
+        x, y = np.meshgrid(self.centers, self.centers, indexing='ij')
+        dens[x*x + y*y > 1.] = np.nan
+
+        return dens
+
+    def add(self, v, weights=None):
+        """add directions to the histogram
+
+        Parameters
+        ----------
+        v: array (n, 3)
+           array of unit vectors
+        weights: array (n) or None, default = None
+           weights of the directions; if None, each has weight 1
+        """
+        v = np.atleast_2d(v)
+        self._add_components(v[:, 0], v[:, 1], v[:, 2], weights)
+
+    def _add_components(self, x, y, z, weights=None):
+        """add directions given by arrays of components"""
+        px, py = _project(x, y, z)
+        flat = self._bin_index(px)*self.nbins + self._bin_index(py)
+
+        if weights is None:
+            weights = np.ones(flat.size)
+        self.counts += np.bincount(
+            flat.ravel(), weights=weights, minlength=self.nbins**2
+        ).reshape(self.nbins, self.nbins)
+        self.total += np.sum(weights)
+
+    def _bin_index(self, p):
+        """bin indices of projected coordinates"""
+        i = np.floor(0.5*(p + 1.)*self.nbins).astype(int)
+        return np.clip(i, 0, self.nbins - 1, out=i)
+
+
+def pole_figure(
+        rmats, csym, h, weights=None, nbins=DEFAULT_NBINS,
+        chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """pole figure of a crystal direction
+
+    Parameters
+    ----------
+    rmats: array (n, 3, 3)
+       rotation matrices of the orientations
+    csym: CrystalSymmetry
+       crystal symmetry group
+    h: array (3)
+       crystal direction, e.g. a plane normal; it is normalized
+    weights: array (n) or None, default = None
+       weights of the orientations, e.g. grain volumes; if None, all
+       orientations have the same weight
+    nbins: int, default = DEFAULT_NBINS
+       number of bins in each of x and y
+    chunk_size: int, default = DEFAULT_CHUNK_SIZE
+       number of poles to bin at a time
+
+    Returns
+    -------
+    PoleFigure
+       histogram of the sample directions of `h` and its equivalents
+    """
+    h = np.asarray(h, dtype=float)
+    hs_t = (csym.rmats @ (h/np.linalg.norm(h))).T
+    # Component i of the poles is r[:, i, :] @ hs.T, of shape (n, nsymm).
+    return _accumulate(
+        rmats, weights, csym.nsymm, nbins, chunk_size,
+        lambda r: [r[:, i, :] @ hs_t for i in range(3)]
+    )
+
+
+def inverse_pole_figure(
+        rmats, csym, d, weights=None, nbins=DEFAULT_NBINS,
+        chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """inverse pole figure of a sample direction
+
+    Parameters
+    ----------
+    rmats: array (n, 3, 3)
+       rotation matrices of the orientations
+    csym: CrystalSymmetry
+       crystal symmetry group
+    d: array (3)
+       sample direction, e.g. the loading axis; it is normalized
+    weights: array (n) or None, default = None
+       weights of the orientations, e.g. grain volumes; if None, all
+       orientations have the same weight
+    nbins: int, default = DEFAULT_NBINS
+       number of bins in each of x and y
+    chunk_size: int, default = DEFAULT_CHUNK_SIZE
+       number of poles to bin at a time
+
+    Returns
+    -------
+    PoleFigure
+       histogram of the crystal directions of `d`, with all their symmetric
+       equivalents
+    """
+    d = np.asarray(d, dtype=float)
+    d = d/np.linalg.norm(d)
+    srm = csym.rmats
+
+    def components(r):
+        # With c = r.T @ d, component i of the crystal directions is
+        # c @ srm[:, i, :].T, of shape (n, nsymm).
+        c = d @ r
+        return [c @ srm[:, i, :].T for i in range(3)]
+
+    return _accumulate(
+        rmats, weights, csym.nsymm, nbins, chunk_size, components
+    )
+
+
+def _accumulate(rmats, weights, nsymm, nbins, chunk_size, components):
+    """bin pole components of orientations in chunks"""
+    rmats = np.asarray(rmats)
+    if rmats.ndim == 2:
+        rmats = rmats.reshape((1, 3, 3))
+    n = len(rmats)
+    if weights is None:
+        weights = np.ones(n)
+    weights = np.asarray(weights, dtype=float)
+    if weights.shape != (n,):
+        raise ValueError("weights must have one value per orientation")
+
+    pf = PoleFigure(nbins)
+    nchunk = max(1, chunk_size // nsymm)
+    for i0 in range(0, n, nchunk):
+        i1 = i0 + nchunk
+        pf._add_components(
+            *components(rmats[i0:i1]), np.repeat(weights[i0:i1], nsymm)
+        )
+
+    return pf
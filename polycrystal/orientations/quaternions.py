@@ -1,4 +1,17 @@
-"""Quaternion operations"""
+"""Quaternion operations
+
+Precision
+---------
+Results have the floating point type of the quaternion or matrix arguments,
+so float32 arrays stay float32 and use half the memory; other inputs give
+float64. Sums over many orientations, e.g. for averages, are accumulated in
+float64. With float32, quaternion and matrix entries are accurate to a few
+units of 6e-8, and angles computed with `arctan2` to about 1e-7 radians, but
+angles from `arccos` of a scalar part lose half the digits near zero, to
+about 1e-3 radians.
+"""
+import warnings
+
 import numpy as np
 
 # default cutoff for angles (in radians) near 0/180
@@ -10,9 +23,14 @@ def _rankone(a, b):
     return np.einsum('ij,ik->ijk', a, b)
 
 
+def _float_dtype(*arrays):
+    """floating point type for results: float32 or wider, from the inputs"""
+    return np.result_type(*arrays, np.float32)
+
+
 def _vec2skew(v):
     """axial vector to skew matrix"""
-    W = np.zeros((len(v), 3, 3))
+    W = np.zeros((len(v), 3, 3), dtype=v.dtype)
     W[:,2,1] = v[:, 0]
     W[:,0,2] = v[:, 1]
     W[:,1,0] = v[:, 2]
@@ -22,7 +40,53 @@ def _vec2skew(v):
     return W
 
 
-def multiply(q_1, q_2):
+# Terms of the quaternion product p = a*b: for each component of p, a list of
+# (sign, i, j) for the terms sign*a_i*b_j. Terms are ordered so that
+# a_i*b_j and a_j*b_i are adjacent, making q^-1 * q exactly the identity.
+_PRODUCT_TERMS = (
+    ((1, 0, 0), (-1, 1, 1), (-1, 2, 2), (-1, 3, 3)),
+    ((1, 0, 1), (1, 1, 0), (1, 2, 3), (-1, 3, 2)),
+    ((1, 0, 2), (1, 2, 0), (-1, 1, 3), (1, 3, 1)),
+    ((1, 0, 3), (1, 3, 0), (1, 1, 2), (-1, 2, 1)),
+)
+
+
+def _product(q_1, q_2, out, conjugate):
+    """quaternion product of broadcast arrays, written into `out`"""
+    shape = np.broadcast_shapes(q_1.shape, q_2.shape)
+    if out is None:
+        out = np.empty(shape, dtype=_float_dtype(q_1, q_2))
+    elif out.shape != shape:
+        raise ValueError(f"`out` has shape {out.shape}, expected {shape}")
+
+    if np.may_share_memory(out, q_1) or np.may_share_memory(out, q_2):
+        out[...] = _product(q_1, q_2, None, conjugate)
+        return out
+
+    # Each component is accumulated in place using a single temporary.
+    tmp = np.empty(shape[:-1], dtype=out.dtype)
+    for k, terms in enumerate(_PRODUCT_TERMS):
+        out_k = out[..., k]
+        np.multiply(q_1[..., 0], q_2[..., k], out=out_k)
+        for sgn, i, j in terms[1:]:
+            np.multiply(q_1[..., i], q_2[..., j], out=tmp)
+            if conjugate:
+                sgn = -sgn
+            if sgn > 0:
+                out_k += tmp
+            else:
+                out_k -= tmp
+
+    return out
+
+
+def _normalize(q):
+    """normalize quaternion array in place"""
+    q /= np.sqrt(np.einsum('...i,...i->...', q, q))[..., None]
+    return q
+
+
+def multiply(q_1, q_2, out=None, normalize=True):
     """multiply two quaternion arrays
 
     Parameters
@@ -30,7 +94,13 @@ def multiply(q_1, q_2):
     q1, q2: arrays (n, 4)
        two arrays of unit quaternions; the arrays are expected to be of the
        same length, but either array can be a single quaternion (1, 4), in
-       which case the single quaternion is multiplied by all in the other array
+       which case the single quaternion is multiplied by all in the other
+       array; more generally, the arrays can have any leading dimensions that
+       broadcast together, e.g. (n, 1, 4) and (1, m, 4)
+    out: array or None, default = None
+       array to hold the result, with the broadcast shape of the inputs
+    normalize: bool, default = True
+       if True, normalize the product
 
     Returns
     -------
@@ -42,22 +112,55 @@ def multiply(q_1, q_2):
     The result is not processed to enforce nonnegativity of the first component
     (as was done in the matlab  OdfPf package).
     """
-    if q_1.ndim == 1:
-        q_1 = q_1.copy().reshape((1, 4))
-    if q_2.ndim == 1:
-        q_2 = q_2.copy().reshape((1, 4))
-
-    n1 = len(q_1)
-    n2 = len(q_2)
-    n = np.maximum(n1, n2)
-    s1 = q_1[:, 0].reshape((n1,1))
-    v1 = q_1[:, 1:].reshape((n1,3))
-    s2 = q_2[:, 0].reshape((n2,1))
-    v2 = q_2[:, 1:].reshape((n2,3))
-    qs = s1*s2 - np.sum(v1*v2, axis=1).reshape((n,1))
-    qv = (s1*v2) + (s2*v1) + np.cross(v1, v2)
-    qprod = np.hstack((qs, qv))
-    return qprod/np.linalg.norm(qprod, axis=1).reshape(n, 1)
+    q = _product(np.atleast_2d(q_1), np.atleast_2d(q_2), out, False)
+    return _normalize(q) if normalize else q
+
+
+def conjugate_multiply(q_1, q_2, out=None, normalize=True):
+    """multiply conjugate of first quaternion array by the second
+
+    This computes inverse(q_1) * q_2 for unit quaternions without forming the
+    inverse.
+
+    Parameters
+    ----------
+    q1, q2: arrays (..., 4)
+       two arrays of unit quaternions with broadcastable leading dimensions
+    out: array or None, default = None
+       array to hold the result, with the broadcast shape of the inputs
+    normalize: bool, default = True
+       if True, normalize the product
+
+    Returns
+    -------
+    array (..., 4)
+        the array of products
+    """
+    q = _product(np.atleast_2d(q_1), np.atleast_2d(q_2), out, True)
+    return _normalize(q) if normalize else q
+
+
+def outer_multiply(q_1, q_2, out=None, normalize=True):
+    """products of all pairs from two quaternion arrays
+
+    Parameters
+    ----------
+    q1: array (n, 4)
+       array of unit quaternions
+    q2: array (m, 4)
+       array of unit quaternions
+    out: array (n, m, 4) or None, default = None
+       array to hold the result
+    normalize: bool, default = True
+       if True, normalize the product
+
+    Returns
+    -------
+    array (n, m, 4)
+        the array of products q1[i] * q2[j]
+    """
+    q_1, q_2 = np.atleast_2d(q_1), np.atleast_2d(q_2)
+    return multiply(q_1[:, None, :], q_2[None, :, :], out, normalize)
 
 
 def inverse(q):
@@ -101,6 +204,8 @@ def to_rmats(q):
     # with w = theta*n, c = c(theta), s = s(theta)
     # R(w) = cI + (1 - c)(I - NN^T) + s W(n)
     #      = (qs^2 - qv^2) I + 2qv*qv.T + 2qs*W(qv)
+    q = np.asarray(q)
+    q = q.astype(_float_dtype(q), copy=False)
     n = len(q)
 
     qs = q[:, 0].reshape((n,1))
@@ -114,58 +219,149 @@ def to_rmats(q):
     return r
 
 
-def from_rmats(r, cut=_DFLT_CUT):
+def rotate_vectors(q, v, out=None):
+    """rotate vectors by quaternions
+
+    Parameters
+    ----------
+    q: array (n, 4)
+       array of unit quaternions
+    v: array (n, 3)
+       array of vectors; more generally, `q` and `v` can have any leading
+       dimensions that broadcast together
+    out: array or None, default = None
+       array to hold the result, with the broadcast shape
+
+    Returns
+    -------
+    array (n, 3)
+       the rotated vectors, equal to `to_rmats(q) @ v`, but computed without
+       forming the rotation matrices
+    """
+    # With u the vector part and t = 2 u x v, the rotation is:
+    # R v = v + q0 t + u x t
+    q, v = np.asarray(q), np.asarray(v)
+    shape = np.broadcast_shapes(q.shape[:-1], v.shape[:-1]) + (3,)
+    if out is None:
+        out = np.empty(shape, dtype=_float_dtype(q, v))
+    elif out.shape != shape:
+        raise ValueError(f"`out` has shape {out.shape}, expected {shape}")
+    if np.may_share_memory(out, v):
+        v = v.copy()
+
+    u = q[..., 1:]
+    t = np.cross(u, v)
+    t *= 2.
+    np.multiply(q[..., :1], t, out=out)
+    out += v
+    out += np.cross(u, t)
+
+    return out
+
+
+def rotate_vectors_outer(q, v, out=None):
+    """rotate every vector by every quaternion
+
+    Parameters
+    ----------
+    q: array (n, 4)
+       array of unit quaternions
+    v: array (m, 3)
+       array of vectors
+    out: array (n, m, 3) or None, default = None
+       array to hold the result
+
+    Returns
+    -------
+    array (n, m, 3)
+       rotated vectors; element [i, j] is vector `j` rotated by quaternion `i`
+    """
+    q, v = np.atleast_2d(q), np.atleast_2d(v)
+    return rotate_vectors(q[:, None, :], v[None, :, :], out)
+
+
+def from_rmats(r, cut=None, out=None):
     """Convert rotation matrices to quaternions
 
     Parameters
     ----------
     r: array (n, 3, 3)
        arary of rotation matrices
+    cut: float or None, default = None
+       deprecated and ignored, since Shepperd's method needs no cutoff; passing
+       a value gives a DeprecationWarning, and the argument will be removed
+    out: array (n, 4) or None, default = None
+       floating point array to hold the result
 
     Returns
     -------
     q: array (n, 4)
-       array of unit quaternions
+       array of unit quaternions, with nonnegative scalar part
+
+    Notes
+    -----
+    This uses Shepperd's method: the quaternion is computed from the row of
+    the matrix 4 q q^T that has the largest diagonal entry, which avoids loss
+    of precision for all rotation angles, including those near 180 degrees.
     """
-    if r.ndim == 3:
-        rm = r
-    else:
-        # line below failed due to matrix reshape issue
-        # rm = r.reshape((1,3,3))
-        rm = np.asarray(r).copy().reshape((1,3,3))
+    if cut is not None:
+        warnings.warn(
+            "the `cut` argument of from_rmats is ignored and will be removed",
+            DeprecationWarning, stacklevel=2
+        )
+    rm = np.asarray(r)
+    if rm.ndim == 2:
+        rm = rm.reshape((1, 3, 3))
     nq = len(rm)
-
-    # find angle
-    ca = 0.5*(rm.trace(axis1=1, axis2=2) - 1);
-    ca = np.minimum(ca, 1.);
-    ca = np.maximum(ca, -1.);
-    angle = np.arccos(ca)
-
-    # find axis (a little harder)
-    w0 = (rm[:, 2, 1] - rm[:, 1, 2]).reshape((nq, 1))
-    w1 = (rm[:, 0, 2] - rm[:, 2, 0]).reshape((nq, 1))
-    w2 = (rm[:, 1, 0] - rm[:, 0, 1]).reshape((nq, 1))
-    w = np.hstack((w0, w1, w2))
-
-    w[np.where(angle < cut)] = np.ones(3)
-
-    nearpi = np.nonzero(angle > np.pi - cut)[0]
-    n = len(nearpi)
-    wpi = np.zeros((n, 3))
-    if n > 0:
-        rpi = (rm[nearpi] - ca[nearpi].reshape((n,1,1))*np.eye(3))
-        rpi = 0.5* (rpi + rpi.transpose((0,2,1)))
-        di = np.diag_indices(3)
-        for i in range(len(rpi)):
-            ind = np.argmax(rpi[i][di])
-            wpi[i] = rpi[i, ind, :]
-        w[nearpi] = wpi
-
-    sca = np.cos(0.5*angle).reshape(nq, 1)
-    vec = w*(np.sin(0.5*angle)/np.linalg.norm(w, axis=1)).reshape((nq,1))
-    q = np.hstack((sca, vec))
-
-    return q
+    if out is None:
+        out = np.empty((nq, 4), dtype=_float_dtype(rm))
+    elif out.shape != (nq, 4) or not np.issubdtype(out.dtype, np.floating):
+        raise ValueError(
+            f"`out` must be a floating point array of shape {(nq, 4)}, not "
+            f"{out.dtype} with shape {out.shape}"
+        )
+
+    # Chunks are small so that the temporaries stay in cache.
+    for i0 in range(0, nq, _RMATS_CHUNK):
+        i1 = i0 + _RMATS_CHUNK
+        _from_rmats(rm[i0:i1], out[i0:i1])
+
+    return out
+
+
+_RMATS_CHUNK = 2**14
+
+
+def _from_rmats(rm, out):
+    """Shepperd's method for a chunk of matrices"""
+    r00, r01, r02, r10, r11, r12, r20, r21, r22 = (
+        rm[:, i, j] for i in range(3) for j in range(3)
+    )
+    tr = r00 + r11 + r22
+
+    # Rows of 4 q q^T; the diagonal is (1 + tr, 1 + 2 r_aa - tr).
+    k01, k02, k03 = r21 - r12, r02 - r20, r10 - r01
+    k12, k13, k23 = r01 + r10, r02 + r20, r12 + r21
+    rows = (
+        (1. + tr, k01, k02, k03),
+        (k01, 1. + 2.*r00 - tr, k12, k13),
+        (k02, k12, 1. + 2.*r11 - tr, k23),
+        (k03, k13, k23, 1. + 2.*r22 - tr),
+    )
+
+    # Select the row with the largest diagonal entry.
+    use0 = tr >= np.maximum(np.maximum(r00, r11), r22)
+    use1 = ~use0 & (r00 >= r11) & (r00 >= r22)
+    use2 = ~use0 & ~use1 & (r11 >= r22)
+    for j in range(4):
+        out[:, j] = np.where(
+            use0, rows[0][j], np.where(
+                use1, rows[1][j], np.where(use2, rows[2][j], rows[3][j])
+            )
+        )
+
+    _normalize(out)
+    out[out[:, 0] < 0.] *= -1.
 
 
 def from_exp(w, cut=_DFLT_CUT):
@@ -204,7 +400,7 @@ def from_exp(w, cut=_DFLT_CUT):
     return np.hstack((c, s*axis))
 
 
-def random_quats(n, return_matrices=False):
+def random_quats(n, return_matrices=False, rng=None, dtype=float):
     """Generate n random orientations
 
     Parameters
@@ -213,24 +409,95 @@ def random_quats(n, return_matrices=False):
        the number of orientations to generate
     return_matrices: bool, default = False
        if True return matrices, otherwise quaternions
+    rng: None, int, SeedSequence or Generator, default = None
+       source of random numbers; if None, the global numpy random state is
+       used, otherwise it is passed to `np.random.default_rng`
+    dtype: dtype, default = float
+       floating point type of the output, e.g. `np.float32` to halve memory
     """
-    q = np.random.standard_normal((n, 4))
+    dtype = np.dtype(dtype)
+    draw = _normal_sampler(rng, dtype)
+
+    # Resample only the (very unlikely) rows too small to normalize.
+    q = draw((n, 4))
     nrm = np.linalg.norm(q, axis=1)
-    if nrm.min() < 1e-10:
-        raise ValueError("generated zero magnitude vector, try again")
-    qrand = q/nrm.reshape((n, 1))
+    bad = np.flatnonzero(nrm < _MIN_NORM)
+    while len(bad) > 0:
+        q[bad] = draw((len(bad), 4))
+        nrm[bad] = np.linalg.norm(q[bad], axis=1)
+        bad = bad[nrm[bad] < _MIN_NORM]
+    q /= nrm[:, None]
 
     if return_matrices:
-        return to_rmats(qrand)
+        return to_rmats(q).astype(dtype, copy=False)
+    else:
+        return q
+
+
+_MIN_NORM = 1e-10
+
+
+def _normal_sampler(rng, dtype):
+    """function drawing standard normal arrays of a given shape"""
+    if rng is None:
+        return lambda shape: np.random.standard_normal(shape).astype(dtype)
+
+    rng = np.random.default_rng(rng)
+    if dtype in (np.float32, np.float64):
+        return lambda shape: rng.standard_normal(shape, dtype=dtype)
     else:
-        return qrand
+        return lambda shape: rng.standard_normal(shape).astype(dtype)
+
+
+def random_quats_chunks(
+        n, chunk_size, seed=None, return_matrices=False, dtype=float
+):
+    """Generate n random orientations in independent chunks
+
+    Chunk `k` is generated from the `k`-th child of `SeedSequence(seed)`, so
+    the orientations do not depend on the chunk order. To generate chunks in
+    separate workers, give each worker its child sequence, e.g.
+    `random_quats(size, rng=np.random.SeedSequence(seed).spawn(nchunks)[k])`.
+
+    Parameters
+    ----------
+    n: int
+       the number of orientations to generate
+    chunk_size: int
+       the number of orientations in each chunk; the last may be smaller
+    seed: None, int or SeedSequence, default = None
+       entropy for the random numbers; if None, fresh entropy is used
+    return_matrices: bool, default = False
+       if True return matrices, otherwise quaternions
+    dtype: dtype, default = float
+       floating point type of the output
+
+    Yields
+    ------
+    array (m, 4) or (m, 3, 3)
+       the next chunk of orientations
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        # Copy, so that the same children are spawned each time.
+        seed = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key)
+    else:
+        seed = np.random.SeedSequence(seed)
+
+    nchunks = -(-n // chunk_size)
+    for k, child in enumerate(seed.spawn(nchunks)):
+        size = min(chunk_size, n - k*chunk_size)
+        yield random_quats(size, return_matrices, rng=child, dtype=dtype)
 
 
-def random_rmats(n):
+def random_rmats(n, rng=None, dtype=float):
     """return random uniformly distributed rotation matrices
     Parameters
     ----------
     n: int
        the number of orientations to generate
+    rng: None, int, SeedSequence or Generator, default = None
+       source of random numbers, as in `random_quats`
+    dtype: dtype, default = float
+       floating point type of the output
     """
-    return random_quats(n, return_matrices=True)
+    return random_quats(n, return_matrices=True, rng=rng, dtype=dtype)
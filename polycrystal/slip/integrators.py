@@ -0,0 +1,397 @@
+"""Time integration of slip crystal stress and state
+
+The `BackwardEuler` class updates the crystal stress and state variables over
+a strain increment implicitly. The power law shear rates of the slip models
+are very stiff for small rate sensitivities `m`, so explicit integration needs
+tiny time steps; the implicit update is stable for much larger ones.
+
+With the stress as a Mandel 6-vector `sig`, the elastic stiffness `C` and the
+Mandel components `P` (nslip, 6) of the symmetric Schmid tensors, the update
+solves, at each point,
+
+    sig = sig_n + C (deps - dt P^T gamma_dot(tau, state))
+    state = state_n + dt state_derivative(state, gamma_dot(tau, state))
+
+where the resolved shear stresses `tau` are linear in `sig`, as given by the
+`resolved_shear_stress` method of the crystal. The equations are solved by
+Newton's method with a backtracking line search, using the analytic
+derivatives of the slip model. All points are iterated together, and points
+drop out of the iteration as they converge.
+
+The `RK23` class advances the state variables under fixed crystal stresses
+with an explicit embedded Runge-Kutta method. Each point has its own adaptive
+step size, so points with slow state evolution take few steps, and only the
+points still sub-stepping are evaluated.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from ..utils.tensor_data.mandel_system import MandelSystem
+from .slip_models.abc import _add_to, _dense, _matmul
+
+
+DEFAULT_TOL = 1e-8
+
+DEFAULT_MAX_ITER = 25
+
+DEFAULT_CHUNK_SIZE = 2**12
+
+DEFAULT_RTOL = 1e-6
+
+DEFAULT_ATOL = 1e-8
+
+DEFAULT_MAX_STEPS = 10000
+
+
+_flds = ["stress", "state", "converged", "iterations"]
+_UpdateData = namedtuple("_UpdateData", _flds)
+_flds = ["state", "success", "steps"]
+_StateData = namedtuple("_StateData", _flds)
+del _flds
+
+
+class BackwardEuler:
+    """Implicit stress and state update for a slip crystal
+
+    Parameters
+    ----------
+    crystal: SlipCrystal
+        slip crystal, whose model has analytic derivatives
+    stiffness: array (6, 6)
+        elastic stiffness in crystal components in the Mandel system, e.g. the
+        `stiffness` of an elastic `SingleCrystal` with system "MANDEL"
+    tol: float, default = DEFAULT_TOL
+        relative tolerance on the residuals of stress and state
+    max_iter: int, default = DEFAULT_MAX_ITER
+        maximum number of Newton iterations
+    chunk_size: int, default = DEFAULT_CHUNK_SIZE
+        number of points solved at a time
+    """
+
+    MAX_HALVINGS = 10
+
+    MAX_EXTENSIONS = 4
+
+    def __init__(
+            self, crystal, stiffness,
+            tol=DEFAULT_TOL,
+            max_iter=DEFAULT_MAX_ITER,
+            chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        self.crystal = crystal
+        self.stiffness = np.asarray(stiffness, dtype=float)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.chunk_size = chunk_size
+
+        # The resolved shear stresses are sig @ self._rss_6, and the plastic
+        # strain rate is gamma_dot @ self._schmid_6.
+        basis = MandelSystem.from_parts(symm=np.identity(6)).matrices
+        self._rss_6 = crystal.resolved_shear_stress(basis)
+        self._schmid_6 = MandelSystem(crystal.schmid).symm
+        self._c_pt = self.stiffness @ self._schmid_6.T
+
+    def update(self, cstress, state, dstrain, dt):
+        """Update stress and state over a time step
+
+        Parameters
+        ----------
+        cstress: array (npts, 3, 3)
+            symmetric crystal stress at the start of the step, in the crystal
+            frame
+        state: array (npts, nsv)
+            state variables at the start of the step
+        dstrain: array (npts, 3, 3)
+            total strain increment over the step, in the crystal frame
+        dt: float
+            time step
+
+        Returns
+        -------
+        updatedata:
+            namedtuple with `stress` (npts, 3, 3) and `state`, at the end of
+            the step, a boolean array `converged` (npts) and the number of
+            Newton `iterations` (npts) used at each point
+        """
+        state = np.asarray(state, dtype=float)
+        npts = len(state)
+        sig_n = MandelSystem(np.asarray(cstress, dtype=float)).symm
+        deps = MandelSystem(np.asarray(dstrain, dtype=float)).symm
+        sv_n = state.reshape(npts, -1)
+
+        sig = np.empty_like(sig_n)
+        sv = np.empty_like(sv_n)
+        converged = np.zeros(npts, dtype=bool)
+        iterations = np.zeros(npts, dtype=int)
+        sig_tr = sig_n + deps @ self.stiffness.T
+
+        # Trial steps can overflow the power law; their residuals are then
+        # infinite, and they are rejected.
+        with np.errstate(over='ignore', invalid='ignore'):
+            for i0 in range(0, npts, self.chunk_size):
+                i1 = min(i0 + self.chunk_size, npts)
+                c = slice(i0, i1)
+                sig[c], sv[c], converged[c], iterations[c] = self._solve(
+                    sig_n[c], sv_n[c], sig_tr[c], dt
+                )
+
+        return _UpdateData(
+            MandelSystem.from_parts(symm=sig).matrices,
+            sv.reshape(state.shape), converged, iterations
+        )
+
+    def _residual(self, sig, sv, sig_n, sv_n, sig_tr, dt):
+        """residuals of stress and state, and the shear rates"""
+        model = self.crystal.model
+        gdots = model.gamma_dots(sv, sig @ self._rss_6)
+        sd = model.state_derivative(sv, gdots).reshape(sv.shape)
+        r_sig = sig - sig_tr + dt * gdots @ self._c_pt.T
+        r_sv = sv - sv_n - dt * sd
+
+        return r_sig, r_sv, gdots
+
+    def _jacobian(self, sig, sv, gdots, dt):
+        """Jacobian of the residuals with respect to stress and state"""
+        # The model derivatives are used in compressed form; only the blocks
+        # of the Jacobian itself are dense.
+        model = self.crystal.model
+        npts, nsv = sv.shape
+
+        g_rss, g_sv = model.gamma_dots_tangent(sv, sig @ self._rss_6)
+        f_sv, f_gd = model.state_derivative_tangent(sv, gdots)
+        g_sig = (dt * g_rss[:, :, None]) * self._rss_6.T
+
+        jac = np.empty((npts, 6 + nsv, 6 + nsv))
+        jac[:, :6, :6] = self._c_pt @ g_sig
+        jac[:, :6, 6:] = _matmul(dt * self._c_pt, g_sv)
+        jac[:, 6:, :6] = _matmul(f_gd, -g_sig)
+        jss = jac[:, 6:, 6:]
+        jss[...] = _dense(_matmul(f_gd, g_sv))
+        _add_to(jss, f_sv)
+        jss *= -dt
+        jac.reshape(npts, -1)[:, ::7 + nsv] += 1.
+
+        return jac
+
+    def _error(self, r_sig, r_sv, sig_scale, sv_scale):
+        """scaled residual norms; infinite where not finite"""
+        err = np.maximum(
+            np.linalg.norm(r_sig, axis=1)/sig_scale,
+            np.linalg.norm(r_sv, axis=1)/sv_scale
+        )
+        err[~np.isfinite(err)] = np.inf
+
+        return err
+
+    def _solve(self, sig_n, sv_n, sig_tr, dt):
+        """Newton iteration for a chunk of points"""
+        tiny = np.finfo(float).tiny
+        sig_scale = np.maximum(np.linalg.norm(sig_tr, axis=1), tiny)
+        sv_scale = np.maximum(np.linalg.norm(sv_n, axis=1), tiny)
+
+        # Start from the stress and state at the beginning of the step.
+        sig, sv = sig_n.copy(), sv_n.copy()
+        npts = len(sig)
+        converged = np.zeros(npts, dtype=bool)
+        iterations = np.zeros(npts, dtype=int)
+
+        act = np.arange(npts)
+        r_sig, r_sv, gdots = self._residual(sig, sv, sig_n, sv_n, sig_tr, dt)
+        err = self._error(r_sig, r_sv, sig_scale, sv_scale)
+
+        def accept(k, step):
+            """take steps at active points `k` that reduce the residual"""
+            i = act[k]
+            sig_try, sv_try = sig[i] + step[:, :6], sv[i] + step[:, 6:]
+            rs, rv, gd = self._residual(
+                sig_try, sv_try, sig_n[i], sv_n[i], sig_tr[i], dt
+            )
+            e = self._error(rs, rv, sig_scale[i], sv_scale[i])
+            ok = e < err[k]
+            j, i = k[ok], i[ok]
+            sig[i], sv[i] = sig_try[ok], sv_try[ok]
+            r_sig[j], r_sv[j], gdots[j], err[j] = rs[ok], rv[ok], gd[ok], e[ok]
+
+            return ok
+
+        for _ in range(self.max_iter):
+            keep = err > self.tol
+            converged[act[~keep]] = True
+            act, err = act[keep], err[keep]
+            r_sig, r_sv, gdots = r_sig[keep], r_sv[keep], gdots[keep]
+            if len(act) == 0:
+                break
+
+            iterations[act] += 1
+            jac = self._jacobian(sig[act], sv[act], gdots, dt)
+            rhs = np.concatenate((r_sig, r_sv), axis=1)
+            step = -np.linalg.solve(jac, rhs[:, :, None])[:, :, 0]
+
+            # Where the full step reduces the residual, take further steps
+            # while it continues to: far above the solution, the power law
+            # makes Newton steps much too short. Elsewhere, backtrack by
+            # halving the step.
+            k = np.arange(len(act))
+            ok = accept(k, step)
+            more = k[ok]
+            for _ in range(self.MAX_EXTENSIONS):
+                if len(more) == 0:
+                    break
+                more = more[accept(more, step[more])]
+
+            todo = k[~ok]
+            lam = 1.
+            for _ in range(self.MAX_HALVINGS):
+                if len(todo) == 0:
+                    break
+                lam *= 0.5
+                todo = todo[~accept(todo, lam * step[todo])]
+
+            # Points where the line search failed cannot make progress.
+            keep = np.ones(len(act), dtype=bool)
+            keep[todo] = False
+            act, err = act[keep], err[keep]
+            r_sig, r_sv, gdots = r_sig[keep], r_sv[keep], gdots[keep]
+        else:
+            converged[act[err <= self.tol]] = True
+
+        return sig, sv, converged, iterations
+
+
+class RK23:
+    """Adaptive explicit integration of slip crystal state variables
+
+    This uses the Bogacki-Shampine embedded pair of orders 3 and 2, with the
+    step size controlled separately at each point. Rates are computed by the
+    crystal, so shear rates are capped by the `gammadot_max` of its model.
+
+    Parameters
+    ----------
+    crystal: SlipCrystal
+        slip crystal
+    rtol: float, default = DEFAULT_RTOL
+        relative tolerance on the local error of the state variables
+    atol: float, default = DEFAULT_ATOL
+        absolute tolerance on the local error of the state variables
+    max_steps: int, default = DEFAULT_MAX_STEPS
+        maximum number of steps, including rejected ones, at each point
+    """
+
+    # Coefficients of the Bogacki-Shampine pair; the rate at the end of an
+    # accepted step is the first rate of the next one.
+    _C2, _C3 = 0.5, 0.75
+    _B = np.array([2/9, 1/3, 4/9])
+    _E = np.array([-5/72, 1/12, 1/9, -1/8])
+
+    SAFETY = 0.9
+
+    MIN_FACTOR = 0.2
+
+    MAX_FACTOR = 5.0
+
+    def __init__(
+            self, crystal,
+            rtol=DEFAULT_RTOL,
+            atol=DEFAULT_ATOL,
+            max_steps=DEFAULT_MAX_STEPS
+    ):
+        self.crystal = crystal
+        self.rtol = rtol
+        self.atol = atol
+        self.max_steps = max_steps
+
+    def integrate(self, cstress, state, dt):
+        """Advance the state variables over a time interval
+
+        Parameters
+        ----------
+        cstress: array (npts, 3, 3)
+            crystal stress in crystal reference frame, fixed over the interval
+        state: array (npts, nsv)
+            state variables at the start of the interval
+        dt: float
+            length of the time interval
+
+        Returns
+        -------
+        statedata:
+            namedtuple with the `state` at the end of the interval, a boolean
+            array `success` (npts), which is False where the maximum number
+            of steps was reached, and the number of `steps` (npts) taken at
+            each point, including rejected ones
+        """
+        cstress = np.asarray(cstress)
+        state = np.asarray(state, dtype=float)
+        npts = len(state)
+        y = state.reshape(npts, -1).copy()
+
+        def rates(i, yi):
+            sd = self.crystal.get(
+                cstress[i], yi.reshape((len(i),) + state.shape[1:]),
+                state_derivative=True
+            ).state_derivative
+            return sd.reshape(yi.shape)
+
+        t = np.zeros(npts)
+        steps = np.zeros(npts, dtype=int)
+        success = np.ones(npts, dtype=bool)
+
+        act = np.arange(npts)
+        k1 = rates(act, y)
+        h = self._initial_step(y, k1, dt)
+
+        while len(act) > 0:
+            steps[act] += 1
+            yi = y[act]
+            last = h[act] >= dt - t[act]
+            hi = np.where(last, dt - t[act], h[act])[:, None]
+            k1i = k1[act]
+            k2 = rates(act, yi + self._C2 * hi * k1i)
+            k3 = rates(act, yi + self._C3 * hi * k2)
+            y_new = yi + hi * (
+                self._B[0] * k1i + self._B[1] * k2 + self._B[2] * k3
+            )
+            k4 = rates(act, y_new)
+            err = hi * (
+                self._E[0] * k1i + self._E[1] * k2 + self._E[2] * k3 +
+                self._E[3] * k4
+            )
+            scale = self.atol + self.rtol * np.maximum(
+                np.abs(yi), np.abs(y_new)
+            )
+            enorm = np.sqrt(np.mean((err / scale)**2, axis=1))
+
+            # Accept steps within the tolerance, and choose the next step
+            # size from the error at all points.
+            ok = enorm <= 1.
+            i = act[ok]
+            y[i], k1[i] = y_new[ok], k4[ok]
+            t[i] = np.where(last[ok], dt, t[i] + hi[ok, 0])
+            with np.errstate(divide='ignore'):
+                factor = self.SAFETY * enorm**(-1/3)
+            factor = np.clip(
+                np.nan_to_num(factor, nan=self.MIN_FACTOR),
+                self.MIN_FACTOR, np.where(ok, self.MAX_FACTOR, 1.)
+            )
+            h[act] = hi[:, 0] * factor
+
+            # Points are done at the end of the interval, and fail when they
+            # reach the step limit.
+            done = t[act] >= dt
+            failed = ~done & (steps[act] >= self.max_steps)
+            success[act[failed]] = False
+            act = act[~(done | failed)]
+
+        return _StateData(y.reshape(state.shape), success, steps)
+
+    def _initial_step(self, y, f, dt):
+        """initial step sizes from the state and rates at each point"""
+        scale = self.atol + self.rtol * np.abs(y)
+        d0 = np.sqrt(np.mean((y / scale)**2, axis=1))
+        d1 = np.sqrt(np.mean((f / scale)**2, axis=1))
+        h = np.full(len(y), float(dt))
+        big = (d0 > 1e-5) & (d1 > 1e-5)
+        h[big] = np.minimum(dt, 0.01 * d0[big] / d1[big])
+
+        return h
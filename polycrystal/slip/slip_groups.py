@@ -1,7 +1,9 @@
 """Groups of slip systems realted by crystal symmetry
 
 This provides some standard slip system groups. The interface is provided
-here by the `get_group` and `list_groups` functions.
+here by the `get_group` and `list_groups` functions. Groups, with their Schmid
+tensors, are kept in a single bounded cache, reported by `cache_info` and
+released by `cache_clear`.
 
 REFERENCES
 ----------
@@ -11,13 +13,21 @@ REFERENCES
    Materials Transactions A 54, no. 9 (September 1, 2023): 3373–88.
    https://doi.org/10.1007/s11661-023-07114-9.
 """
+import functools
+
 import numpy as np
 
 from ..orientations import crystalsymmetry
 from .slipgroup import SlipGroup
 
 
-__all__ = ['get_group', 'list_groups']
+__all__ = ['get_group', 'list_groups', 'cache_info', 'cache_clear']
+
+
+# Groups are cached by name and c/a ratio rounded to this many decimals; at
+# most CACHE_SIZE groups are kept, least recently used first out.
+CBYA_DECIMALS = 8
+CACHE_SIZE = 256
 
 
 def get_group(name, cbya=None):
@@ -29,15 +39,50 @@ def get_group(name, cbya=None):
         name of the group; see `list_groups` for available names
     cbya: float or None, default = None
         the c/a ratio for hexagonal slip groups
+
+    RETURNS
+    -------
+    SlipGroup
+        the slip group; groups are cached, so repeated calls with the same
+        name and c/a ratio (to `CBYA_DECIMALS` decimals) return the same
+        shared instance
     """
     if name.startswith(("fcc", "bcc")):
-        return registry[name]()
+        return _cached_group(name, None)
     elif name.startswith("hcp"):
         if cbya is None:
             raise RuntimeError("c/a ratio not specified for HCP")
+        return _cached_group(name, round(float(cbya), CBYA_DECIMALS))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _cached_group(name, cbya):
+    """create slip group, once for each name and c/a ratio"""
+    if cbya is None:
+        return registry[name]()
+    else:
         return registry[name](cbya)
 
 
+def cache_info():
+    """statistics of the slip group cache
+
+    RETURNS
+    -------
+    named tuple
+        hits, misses, maxsize and currsize of the cache
+    """
+    return _cached_group.cache_info()
+
+
+def cache_clear():
+    """clear the slip group cache and its statistics
+
+    This releases all cached groups and their Schmid tensors.
+    """
+    _cached_group.cache_clear()
+
+
 def list_groups():
     """list available slip system groups"""
     return list(registry.keys())
@@ -1,3 +1,4 @@
+from .abc import DiagonalBlocks, StackedBlocks
 from .af_single_hardness import (
     AF_SingleHardnessParameters, AF_SingleHardness,
 )
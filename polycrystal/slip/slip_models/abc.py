@@ -1,6 +1,8 @@
 """Abstract base class for slip_model"""
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 
 class SlipModel(ABC):
 
@@ -33,7 +35,7 @@ class SlipModel(ABC):
         self._gammadot_max = v
 
     @abstractmethod
-    def gamma_dots(self, state_var, rss):
+    def gamma_dots(self, state_var, rss, out=None):
         """Compute slip system shear strain rates
 
         The schmid tensors and the stress need to be in the same reference
@@ -45,6 +47,10 @@ class SlipModel(ABC):
             current values of material state, slip system hardness
         rss: array (npts, nslip)
             resolved shear stress
+        out: array (npts, nslip) or None, default = None
+            C-contiguous array in which to write the result; models without
+            this argument are still supported, and `SlipCrystal.get` copies
+            their results
 
         RETURNS
         -------
@@ -54,7 +60,7 @@ class SlipModel(ABC):
         pass
 
     @abstractmethod
-    def state_derivative(self, state_var, gamdot):
+    def state_derivative(self, state_var, gamdot, out=None):
         """Derivative of state variable
 
         Parameters
@@ -63,6 +69,10 @@ class SlipModel(ABC):
           current values of material state (slip system strength)
         gamdot: array (npts, nslip)
           slip system shear rates (gamma dots)
+        out: array or None, default = None
+          C-contiguous array, shaped like `state_var`, in which to write the
+          result; models without this argument are still supported, and
+          `SlipCrystal.get` copies their results
 
         Returns
         -------
@@ -70,3 +80,333 @@ class SlipModel(ABC):
             derivative of state variables at each point
         """
         pass
+
+    def gamma_dots_tangent(self, state_var, rss):
+        """Derivatives of slip system shear rates, in compressed form
+
+        This is optional; models without analytic derivatives raise
+        NotImplementedError.
+
+        Parameters
+        ----------
+        state_var: array (npts, nsv)
+            current values of material state
+        rss: array (npts, nslip)
+            resolved shear stress
+
+        Returns
+        -------
+        d_rss: array (npts, nslip)
+            derivative of each shear rate with respect to the resolved shear
+            stress on its own slip system; the others do not depend on it
+        d_state: array (npts, nslip, nsv) or DiagonalBlocks
+            derivatives of the shear rates with respect to the state variables
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not have analytic derivatives"
+        )
+
+    def state_derivative_tangent(self, state_var, gamdot):
+        """Derivatives of the state variable rates, in compressed form
+
+        This is optional; models without analytic derivatives raise
+        NotImplementedError.
+
+        Parameters
+        ----------
+        state_var: array (npts, nsv)
+            current values of material state
+        gamdot: array (npts, nslip)
+            slip system shear rates (gamma dots)
+
+        Returns
+        -------
+        d_state: array (npts, nsv, nsv) or DiagonalBlocks
+            derivatives of the state rates with respect to the state variables
+        d_gamdot: array (npts, nsv, nslip), DiagonalBlocks or StackedBlocks
+            derivatives of the state rates with respect to the shear rates
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not have analytic derivatives"
+        )
+
+    def gamma_dots_jacobian(self, state_var, rss):
+        """Derivatives of slip system shear rates
+
+        These are the derivatives of `gamma_dots_tangent`, with the state
+        derivatives as a dense array.
+
+        Parameters
+        ----------
+        state_var: array (npts, nsv)
+            current values of material state
+        rss: array (npts, nslip)
+            resolved shear stress
+
+        Returns
+        -------
+        d_rss: array (npts, nslip)
+            derivative of each shear rate with respect to the resolved shear
+            stress on its own slip system; the others do not depend on it
+        d_state: array (npts, nslip, nsv)
+            derivatives of the shear rates with respect to the state variables
+        """
+        d_rss, d_state = self.gamma_dots_tangent(state_var, rss)
+        return d_rss, _dense(d_state)
+
+    def state_derivative_jacobian(self, state_var, gamdot):
+        """Derivatives of the state variable rates
+
+        These are the derivatives of `state_derivative_tangent` as dense
+        arrays.
+
+        Parameters
+        ----------
+        state_var: array (npts, nsv)
+            current values of material state
+        gamdot: array (npts, nslip)
+            slip system shear rates (gamma dots)
+
+        Returns
+        -------
+        d_state: array (npts, nsv, nsv)
+            derivatives of the state rates with respect to the state variables
+        d_gamdot: array (npts, nsv, nslip)
+            derivatives of the state rates with respect to the shear rates
+        """
+        d_state, d_gamdot = self.state_derivative_tangent(state_var, gamdot)
+        return _dense(d_state), _dense(d_gamdot)
+
+    def _power_law(self, x, gamdot0, m):
+        """Power law shear rates, computed in place
+
+        Parameters
+        ----------
+        x: array (npts, nslip)
+           effective resolved shear stress divided by the hardness; it is
+           overwritten with the shear rates
+        gamdot0: float
+           reference deformation rate
+        m: float
+           rate dependence
+
+        Returns
+        -------
+        array (npts, nslip)
+           `x`, now holding gamdot0 * |x|^(1/m) * sign(x)
+        """
+        if self.gammadot_max is not None:
+            t_max = np.power(self.gammadot_max/gamdot0, m)
+            np.clip(x, -t_max, t_max, out=x)
+
+        # The sign is carried by computing x * |x|^(1/m - 1).
+        absx = np.abs(x)
+        np.power(absx, 1/m - 1, out=absx)
+        x *= absx
+        x *= gamdot0
+
+        return x
+
+    def _power_law_derivative(self, x, gamdot0, m):
+        """Derivative of the power law shear rates
+
+        Parameters
+        ----------
+        x: array (npts, nslip)
+           effective resolved shear stress divided by the hardness
+        gamdot0: float
+           reference deformation rate
+        m: float
+           rate dependence
+
+        Returns
+        -------
+        array (npts, nslip)
+           derivative of the shear rates with respect to `x`; it is zero
+           where the rates are capped by `gammadot_max`
+        """
+        absx = np.abs(x)
+        deriv = (gamdot0/m) * np.power(absx, 1/m - 1)
+        if self.gammadot_max is not None:
+            t_max = np.power(self.gammadot_max/gamdot0, m)
+            deriv[absx > t_max] = 0.
+
+        return deriv
+
+
+class DiagonalBlocks:
+    """Batched matrices made of diagonal blocks
+
+    Derivatives with respect to fields with one value per slip system, such as
+    hardnesses and backstresses, are often diagonal in the slip systems; this
+    stores only the diagonals.
+
+    Parameters
+    ----------
+    diagonals: array (npts, nrow, ncol, k)
+        block (i, j) of the matrix at point p is diag(diagonals[p, i, j])
+
+    Attributes
+    ----------
+    shape: tuple
+        shape, (npts, nrow * k, ncol * k), of the dense array
+    """
+
+    def __init__(self, diagonals):
+        self.diagonals = diagonals
+
+    @property
+    def shape(self):
+        npts, nrow, ncol, k = self.diagonals.shape
+        return npts, nrow * k, ncol * k
+
+    def dense(self):
+        """matrices as a dense array (npts, nrow * k, ncol * k)"""
+        npts, nrow, ncol, k = self.diagonals.shape
+        d = np.zeros((npts, nrow, k, ncol, k), dtype=self.diagonals.dtype)
+        i = np.arange(k)
+        d[:, :, i, :, i] = self.diagonals.transpose((3, 0, 1, 2))
+
+        return d.reshape(self.shape)
+
+    def add_to(self, a):
+        """add the matrices to a dense array (npts, nrow * k, ncol * k)"""
+        _, nrow, ncol, k = self.diagonals.shape
+        for i in range(nrow):
+            for j in range(ncol):
+                block = a[:, i*k:(i + 1)*k, j*k:(j + 1)*k]
+                np.einsum("pkk->pk", block)[...] += self.diagonals[:, i, j]
+
+    def matmul(self, b):
+        """product of the matrices with vectors, matrices or diagonal blocks
+
+        Parameters
+        ----------
+        b: array (npts, ncol * k) or (npts, ncol * k, m), or DiagonalBlocks
+            vectors or matrices at each point, or diagonal blocks with the
+            same block size `k` and `ncol` block rows
+
+        Returns
+        -------
+        array (npts, nrow * k) or (npts, nrow * k, m), or DiagonalBlocks
+            products at each point
+        """
+        if isinstance(b, DiagonalBlocks):
+            return DiagonalBlocks(
+                np.einsum("pijk,pjlk->pilk", self.diagonals, b.diagonals)
+            )
+
+        npts, nrow, ncol, k = self.diagonals.shape
+        tail = b.shape[2:]
+        b = b.reshape((npts, 1, ncol, k) + tail)
+        d = self.diagonals.reshape(self.diagonals.shape + len(tail)*(1,))
+
+        return (d * b).sum(2).reshape((npts, nrow * k) + tail)
+
+    def rmatmul(self, a):
+        """product of matrices with these matrices, `a @ self`
+
+        Parameters
+        ----------
+        a: array (m, nrow * k) or (npts, m, nrow * k)
+            matrix, common to all points, or matrices at each point
+
+        Returns
+        -------
+        array (npts, m, ncol * k)
+            products at each point
+        """
+        npts, nrow, ncol, k = self.diagonals.shape
+        a = a.reshape(a.shape[:-1] + (nrow, k))
+        subs = "mik" if a.ndim == 3 else "pmik"
+        prod = np.einsum(f"{subs},pijk->pmjk", a, self.diagonals)
+
+        return prod.reshape(npts, -1, ncol * k)
+
+
+class StackedBlocks:
+    """Batched matrices stacked from blocks of rows
+
+    This combines row blocks of different structure, e.g. a dense block for
+    the derivatives of hardnesses with latent hardening and diagonal blocks
+    for those of backstresses.
+
+    Parameters
+    ----------
+    blocks: list of arrays (npts, nrow_i, ncol) or DiagonalBlocks
+        row blocks, from top to bottom, all with the same number of columns
+
+    Attributes
+    ----------
+    shape: tuple
+        shape, (npts, sum of nrow_i, ncol), of the dense array
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    @property
+    def shape(self):
+        npts, _, ncol = self.blocks[0].shape
+        return npts, sum(b.shape[1] for b in self.blocks), ncol
+
+    def dense(self):
+        """matrices as a dense array (npts, sum of nrow_i, ncol)"""
+        return np.concatenate([_dense(b) for b in self.blocks], axis=1)
+
+    def add_to(self, a):
+        """add the matrices to a dense array (npts, sum of nrow_i, ncol)"""
+        i0 = 0
+        for b in self.blocks:
+            _add_to(a[:, i0:i0 + b.shape[1]], b)
+            i0 += b.shape[1]
+
+    def matmul(self, b):
+        """product of the matrices with matrices or diagonal blocks
+
+        Parameters
+        ----------
+        b: array (npts, ncol, m) or DiagonalBlocks
+            matrices at each point
+
+        Returns
+        -------
+        array (npts, sum of nrow_i, m)
+            products at each point
+        """
+        return np.concatenate(
+            [_dense(_matmul(blk, b)) for blk in self.blocks], axis=1
+        )
+
+
+def _dense(a):
+    """dense array from an array, DiagonalBlocks or StackedBlocks"""
+    if isinstance(a, (DiagonalBlocks, StackedBlocks)):
+        return a.dense()
+    return a
+
+
+def _add_to(a, b):
+    """add an array, DiagonalBlocks or StackedBlocks to a dense array"""
+    if isinstance(b, (DiagonalBlocks, StackedBlocks)):
+        b.add_to(a)
+    else:
+        a += b
+
+
+def _matmul(a, b):
+    """matrix product of arrays, DiagonalBlocks or StackedBlocks"""
+    if isinstance(a, (DiagonalBlocks, StackedBlocks)):
+        return a.matmul(b)
+    if isinstance(b, DiagonalBlocks):
+        return b.rmatmul(a)
+    return a @ b
+
+
+def _batch_diag(v):
+    """diagonal matrices, shape (n, k, k), from an array of diagonals (n, k)"""
+    n, k = v.shape
+    d = np.zeros((n, k, k), dtype=v.dtype)
+    d.reshape(n, k*k)[:, ::k + 1] = v
+
+    return d
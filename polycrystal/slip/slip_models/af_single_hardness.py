@@ -41,23 +41,43 @@ class AF_SingleHardness(SlipModel):
     def num_statevar(self, num_slipsys):
         return 1
 
-    def gamma_dots(self, state_var, rss):
+    def gamma_dots(self, state_var, rss, out=None):
 
-        gamdot0 = self.params.gamma_dot_0
-        gamdot_max = self.gammadot_max
-        n = 1/self.params.m
-        g = state_var
+        g = state_var.reshape((len(state_var), 1))
+        x = np.divide(rss, g, out=out)
 
-        taunrm = np.abs(rss/g.reshape((len(g), 1)))
-        if gamdot_max is not None:
-            t_max = np.power(gamdot_max/gamdot0, self.params.m)
-            taunrm = np.minimum(taunrm, t_max)
+        return self._power_law(x, self.params.gamma_dot_0, self.params.m)
 
-        return gamdot0 * np.power(taunrm, n) * np.sign(rss)
+    def state_derivative(self, state_var, gamdot, out=None):
 
-    def state_derivative(self, state_var, gamdot):
+        sv = state_var.ravel()
+        sum_absgdot = np.abs(gamdot).sum(1)
+
+        # The state may be (npts) or (npts, 1); write through a flat view.
+        sd = np.multiply(
+            self.params.H - self.params.H_d * sv, sum_absgdot,
+            out=None if out is None else out.reshape(len(sv))
+        )
+        return sd if out is None else out
+
+    def gamma_dots_tangent(self, state_var, rss):
+
+        g = state_var.reshape((len(state_var), 1))
+        x = rss/g
+        d_x = self._power_law_derivative(
+            x, self.params.gamma_dot_0, self.params.m
+        )
+        d_rss = d_x/g
+
+        return d_rss, (-d_rss*x)[:, :, None]
+
+    def state_derivative_tangent(self, state_var, gamdot):
 
-        sv = state_var.flatten()
+        sv = state_var.ravel()
         sum_absgdot = np.abs(gamdot).sum(1)
+        d_state = (-self.params.H_d * sum_absgdot).reshape(len(sv), 1, 1)
+        d_gamdot = (self.params.H - self.params.H_d * sv)[:, None] * (
+            np.sign(gamdot)
+        )
 
-        return (self.params.H - self.params.H_d * sv) * sum_absgdot
+        return d_state, d_gamdot[:, None, :]
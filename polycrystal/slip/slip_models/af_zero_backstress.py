@@ -3,7 +3,7 @@ from collections import namedtuple
 
 import numpy as np
 
-from .abc import SlipModel
+from .abc import SlipModel, DiagonalBlocks, _batch_diag
 
 _flds = ["gamma_dot_0", "m", "H", "H_d", "q12"]
 AF_ZeroBackStressParameters = namedtuple(
@@ -42,28 +42,64 @@ class AF_ZeroBackStress(SlipModel):
     def num_statevar(self, num_slipsys):
         return num_slipsys
 
-    def gamma_dots(self, state_var, rss):
+    def gamma_dots(self, state_var, rss, out=None):
 
-        gamdot0 = self.params.gamma_dot_0
-        gamdot_max = self.gammadot_max
-        n = 1/self.params.m
-        g = state_var
+        x = np.divide(rss, state_var, out=out)
 
-        taunrm = np.abs(rss/g)
-        if gamdot_max is not None:
-            t_max = np.power(gamdot_max/gamdot0, self.params.m)
-            taunrm = np.minimum(taunrm, t_max)
+        return self._power_law(x, self.params.gamma_dot_0, self.params.m)
 
-        return gamdot0 * np.power(taunrm, n) * np.sign(rss)
+    def state_derivative(self, state_var, gamdot, out=None):
 
-    def state_derivative(self, state_var, gamdot):
+        return _hardness_derivative(self.params, state_var, gamdot, out)
 
-        qii_fac = self.params.q12 - 1
-        sgdot = np.abs(gamdot).sum(1).reshape((len(gamdot), 1))
+    def gamma_dots_tangent(self, state_var, rss):
 
-        direct = self.params.H * (
-            self.params.q12 * sgdot - qii_fac * np.abs(gamdot)
+        x = rss/state_var
+        d_x = self._power_law_derivative(
+            x, self.params.gamma_dot_0, self.params.m
         )
-        dynamic = self.params.H_d * state_var * sgdot
+        d_rss = d_x/state_var
 
-        return direct - dynamic
+        return d_rss, DiagonalBlocks((-d_rss*x)[:, None, None, :])
+
+    def state_derivative_tangent(self, state_var, gamdot):
+
+        d_g, d_gamdot = _hardness_tangent(self.params, state_var, gamdot)
+        return DiagonalBlocks(d_g[:, None, None, :]), d_gamdot
+
+
+def _hardness_derivative(params, g, gamdot, out=None):
+    """Hardness derivative with latent hardening, computed in place
+
+    The rate is H * (q12 * sum|gamdot| - (q12 - 1) * |gamdot|) - H_d * g *
+    sum|gamdot|, where sums are over slip systems.
+    """
+    absgdot = np.abs(gamdot)
+    sgdot = absgdot.sum(1, keepdims=True)
+
+    out = np.multiply(g, -params.H_d, out=out)
+    out += params.H * params.q12
+    out *= sgdot
+    absgdot *= params.H * (params.q12 - 1)
+    out -= absgdot
+
+    return out
+
+
+def _hardness_tangent(params, g, gamdot):
+    """Derivatives of the hardness rate with latent hardening
+
+    Returns the derivative with respect to hardness, which is diagonal, as an
+    array (npts, nslip), and the derivative with respect to the shear rates
+    as an array (npts, nslip, nslip).
+    """
+    sgn = np.sign(gamdot)
+    sgdot = np.abs(gamdot).sum(1, keepdims=True)
+
+    d_g = np.broadcast_to(-params.H_d * sgdot, g.shape)
+    d_gamdot = (params.H * params.q12 - params.H_d * g)[:, :, None] * (
+        sgn[:, None, :]
+    )
+    d_gamdot -= _batch_diag(params.H * (params.q12 - 1) * sgn)
+
+    return d_g, d_gamdot
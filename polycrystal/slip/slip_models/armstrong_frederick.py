@@ -3,7 +3,8 @@ from collections import namedtuple
 
 import numpy as np
 
-from .abc import SlipModel
+from .abc import SlipModel, DiagonalBlocks, StackedBlocks
+from .af_zero_backstress import _hardness_derivative, _hardness_tangent
 
 _flds = ["gamma_dot_0", "m", "H", "H_d", "A", "A_d", "q12"]
 ArmstrongFrederickParameters = namedtuple(
@@ -61,7 +62,7 @@ class ArmstrongFrederick(SlipModel):
     def num_statevar(self, num_slipsys):
         return num_slipsys * 2
 
-    def gamma_dots(self, state_var, rss):
+    def gamma_dots(self, state_var, rss, out=None):
         """Compute slip system shear strain rates
 
         The schmid tensors and the stress need to be in the same reference
@@ -74,32 +75,26 @@ class ArmstrongFrederick(SlipModel):
             backstresses (all hardnesses before backstresses)
         rss: array (npts, nslip)
             resolved shear stress
+        out: array (npts, nslip) or None, default = None
+            C-contiguous array in which to write the result
 
         RETURNS
         -------
         array (npts, nslip)
             the slip system shear rates, gamma dots
         """
-        gamdot0 = self.params.gamma_dot_0
-        gamdot_max = self.gammadot_max
-        n = 1/self.params.m
-
         shp = state_var.shape
         state_var = state_var.reshape(shp[0], 2, shp[1]//2)
         G, CHI = 0, 1
         g = state_var[:, G, :]
         chi = state_var[:, CHI, :]
 
-        dsig = rss - chi
-        dsignrm = np.abs(dsig/g)
-
-        if gamdot_max is not None:
-            d_max = np.power(gamdot_max/gamdot0, self.params.m)
-            dsignrm = np.minimum(dsignrm, d_max)
+        x = np.subtract(rss, chi, out=out)
+        x /= g
 
-        return gamdot0 * np.power(dsignrm, n) * np.sign(dsig)
+        return self._power_law(x, self.params.gamma_dot_0, self.params.m)
 
-    def state_derivative(self, state_var, gamdot):
+    def state_derivative(self, state_var, gamdot, out=None):
         """Derivative of state variable
 
         Parameters
@@ -108,6 +103,8 @@ class ArmstrongFrederick(SlipModel):
             current values of material state; first array is slip system
             hardness, and second is back stress
         gamdot: array (npts, nslip)
+        out: array (npts, 2 * nslip) or None, default = None
+            C-contiguous array in which to write the result
 
         Returns
         -------
@@ -122,22 +119,60 @@ class ArmstrongFrederick(SlipModel):
         g = state_var[:, G, :]
         chi = state_var[:, CHI, :]
 
-        qii_fac = self.params.q12 - 1
-        sgdot = np.abs(gamdot).sum(1).reshape((len(gamdot), 1))
+        if out is None:
+            out = np.empty(shp, dtype=np.result_type(state_var, gamdot))
+        rates = out.reshape(shp[0], 2, shp[1]//2)
 
         # Compute the hardness derivative.
-        direct = self.params.H * (
-            self.params.q12 * sgdot - qii_fac * np.abs(gamdot)
-        )
-        dynamic = self.params.H_d * g * sgdot
-        gdot = direct - dynamic
+        _hardness_derivative(self.params, g, gamdot, out=rates[:, G, :])
 
         # Compute the backstress derivative.
-        direct = self.params.A * gamdot
-        dynamic = self.params.A_d * chi * np.abs(gamdot)
-        chidot = direct - dynamic
+        chidot = rates[:, CHI, :]
+        np.abs(gamdot, out=chidot)
+        chidot *= chi
+        chidot *= -A_d
+        chidot += A * gamdot
+
+        return out
+
+    def gamma_dots_tangent(self, state_var, rss):
+
+        shp = state_var.shape
+        state_var = state_var.reshape(shp[0], 2, shp[1]//2)
+        G, CHI = 0, 1
+        g = state_var[:, G, :]
+        chi = state_var[:, CHI, :]
+
+        x = (rss - chi)/g
+        d_x = self._power_law_derivative(
+            x, self.params.gamma_dot_0, self.params.m
+        )
+        d_rss = d_x/g
+        d_state = np.stack((-d_rss*x, -d_rss), axis=1)
+
+        return d_rss, DiagonalBlocks(d_state[:, None])
+
+    def state_derivative_tangent(self, state_var, gamdot):
+
+        shp = state_var.shape
+        state_var = state_var.reshape(shp[0], 2, shp[1]//2)
+        G, CHI = 0, 1
+        g = state_var[:, G, :]
+        chi = state_var[:, CHI, :]
+
+        # The hardness and backstress rates do not depend on each other.
+        dg_g, dg_gamdot = _hardness_tangent(self.params, g, gamdot)
+        d_state = np.zeros((shp[0], 2, 2, shp[1]//2), dtype=dg_g.dtype)
+        d_state[:, G, G] = dg_g
+        d_state[:, CHI, CHI] = -self.params.A_d * np.abs(gamdot)
+
+        # The backstress rates only depend on their own shear rates.
+        dchi_gamdot = self.params.A - self.params.A_d * chi * np.sign(gamdot)
+        d_gamdot = StackedBlocks(
+            [dg_gamdot, DiagonalBlocks(dchi_gamdot[:, None, None, :])]
+        )
 
-        return np.hstack((gdot, chidot)).reshape(shp)
+        return DiagonalBlocks(d_state), d_gamdot
 
     @staticmethod
     def _hardening_matrix(self, nslip):
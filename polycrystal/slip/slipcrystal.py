@@ -1,11 +1,18 @@
 """Slip based crystal"""
 from collections import namedtuple
+import inspect
 
 import numpy as np
 
+from ..orientations import quaternions as quats
 from ..utils.tensor_data.symmdev_system import SymmDevSystem
 
 
+DEFAULT_CHUNK_SIZE = 2**16
+
+DEFAULT_BLOCK_SIZE = 2**10
+
+
 _flds = [
     "resolved_shear_stress", "gamma_dots", "velocity_gradient",
     "state_derivative"
@@ -31,7 +38,28 @@ class SlipCrystal:
         self.model = model
 
         self._schmid_td = SymmDevSystem(
-            np.hstack([g.schmid for g in self.groups])
+            np.concatenate([g.schmid for g in self.groups])
+        )
+
+        # Resolved shear stresses are linear in the stress components, so
+        # they are the product of the flattened stress with a (9, nslip)
+        # matrix; its rows are the resolved shear stresses of the unit basis.
+        basis = SymmDevSystem(np.identity(9).reshape(9, 3, 3))
+        self._rss_matrix = basis.symmdev @ self.schmid_5.T
+        self._schmid_9 = self.schmid.reshape(self.num_slipsys, 9)
+
+    @property
+    def model(self):
+        """slip model used for deformation and hardness evolution"""
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        """Set method for model"""
+        # Models written without `out` arguments have their results copied.
+        self._model = model
+        self._model_out = (
+            _takes_out(model.gamma_dots), _takes_out(model.state_derivative)
         )
 
     @property
@@ -67,7 +95,7 @@ class SlipCrystal:
         array (npts, nslip)
            array of resolved shear stresses for each slip system
         """
-        return SymmDevSystem(cstress).symmdev @ self.schmid_5.T
+        return np.reshape(cstress, (-1, 9)) @ self._rss_matrix
 
     def velocity_gradient(self, gdots):
         """Plastic velocity gradient from gamma dots
@@ -82,15 +110,44 @@ class SlipCrystal:
         array (m, 3, 3)
            plastic velocity gradient (Lp) at each point
         """
-        return np.einsum("ij,jkl->ikl", gdots, self.schmid)
+        gdots = np.asarray(gdots)
+        return (gdots @ self._schmid_9).reshape(len(gdots), 3, 3)
+
+    def work_buffers(self, state, dtype=float):
+        """Allocate arrays for all outputs of `get`
+
+        Parameters
+        ----------
+        state: array (npts, nsv)
+            microstructural state variables; only the shape is used
+        dtype: numpy dtype, default = float
+            data type of the arrays
+
+        Returns
+        -------
+        slipdata:
+            namedtuple of empty arrays, which can be passed to `get` as `out`
+            and reused for every call with the same number of points
+        """
+        return _SlipData(*(
+            np.empty(shape, dtype=dtype) for shape in self._shapes(state)
+        ))
+
+    def _shapes(self, state):
+        """shapes of the slip data arrays"""
+        npts, nslip = len(state), self.num_slipsys
+        return _SlipData(
+            (npts, nslip), (npts, nslip), (npts, 3, 3), np.shape(state)
+        )
 
     def get(
         self, cstress, state,
             resolved_shear_stress=False,
             gamma_dots=False,
             velocity_gradient=False,
-            state_derivative=False
-
+            state_derivative=False,
+            out=None,
+            block_size=DEFAULT_BLOCK_SIZE
     ):
         """Compute slip data
 
@@ -107,33 +164,177 @@ class SlipCrystal:
             return slip system shear rates
         velocity_gradient: (optional, default=False) bool
             return plastic velocity_gradient
+        state_derivative: (optional, default=False) bool
+            return state variable derivatives, shaped like `state`; e.g.
+            (npts, 1) for a single hardness given as (npts, 1)
+        out: (optional, default=None) slipdata
+            namedtuple of C-contiguous arrays in which to write the outputs,
+            e.g. from `work_buffers`; arrays given for outputs that are not
+            requested are used as work space
+        block_size: (optional, default=DEFAULT_BLOCK_SIZE) int
+            number of points computed together; each block goes through all
+            the steps before the next one
+
+        Returns
+        -------
+        slipdata:
+            namedtuple with requested data
+        """
+        stress_9 = np.reshape(cstress, (-1, 9))
+        npts = len(stress_9)
+        dtype = np.result_type(stress_9, state, np.float32)
+        need_gdots = gamma_dots or velocity_gradient or state_derivative
+        requested = _SlipData(
+            resolved_shear_stress, gamma_dots, velocity_gradient,
+            state_derivative
+        )
+
+        # Use arrays from `out` where given, including as work space for
+        # outputs not requested, and allocate the other requested outputs.
+        if out is None:
+            out = _SlipData()
+        arrays = dict()
+        for name, shape in self._shapes(state)._asdict().items():
+            a = getattr(out, name)
+            if a is not None:
+                if a.shape != shape or not a.flags.c_contiguous:
+                    raise ValueError(
+                        f"{name} buffer must be C-contiguous with shape "
+                        f"{shape}"
+                    )
+            elif getattr(requested, name):
+                a = np.empty(shape, dtype=dtype)
+            arrays[name] = a
+
+        # The remaining intermediates only need space for one block.
+        nslip = self.num_slipsys
+        rss_all = arrays["resolved_shear_stress"]
+        if rss_all is None:
+            rss_blk = np.empty((block_size, nslip), dtype=dtype)
+        gdots_all = arrays["gamma_dots"]
+        if gdots_all is None and need_gdots:
+            gdots_blk = np.empty((block_size, nslip), dtype=dtype)
+        vg_all = arrays["velocity_gradient"]
+        sd_all = arrays["state_derivative"]
+        model = self.model
+        gdots_out, sd_out = self._model_out
+
+        # Compute each block of points completely while it is in cache.
+        for i0 in range(0, npts, block_size):
+            i1 = min(i0 + block_size, npts)
+            nb = i1 - i0
+            rss = rss_blk[:nb] if rss_all is None else rss_all[i0:i1]
+            np.matmul(stress_9[i0:i1], self._rss_matrix, out=rss)
+            if not need_gdots:
+                continue
+
+            gdots = gdots_blk[:nb] if gdots_all is None else gdots_all[i0:i1]
+            if gdots_out:
+                model.gamma_dots(state[i0:i1], rss, out=gdots)
+            else:
+                gdots[...] = model.gamma_dots(state[i0:i1], rss)
+            if velocity_gradient:
+                np.matmul(
+                    gdots, self._schmid_9, out=vg_all[i0:i1].reshape(nb, 9)
+                )
+            if state_derivative:
+                sd = sd_all[i0:i1]
+                if sd_out:
+                    model.state_derivative(state[i0:i1], gdots, out=sd)
+                else:
+                    sd[...] = np.reshape(
+                        model.state_derivative(state[i0:i1], gdots), sd.shape
+                    )
+
+        return _SlipData(*(
+            arrays[name] if want else None
+            for name, want in requested._asdict().items()
+        ))
+
+    def get_sample_frame(
+        self, sstress, state, orientations,
+            resolved_shear_stress=False,
+            gamma_dots=False,
+            velocity_gradient=False,
+            state_derivative=False,
+            chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        """Compute slip data for points with their own orientations
+
+        This is the same as `get`, but the stress is given in the sample
+        frame, and each point has its own crystal orientation.
+
+        Parameters
+        ----------
+        sstress: array (npts, 3, 3)
+            crystal stress in sample reference frame
+        state: array (npts, nsv)
+            microstructural state variables, e.g hardess, etc.
+        orientations: array (npts, 3, 3) or (npts, 4)
+            rotation matrices or quaternions taking crystal components to
+            sample components at each point
+
+        resolved_shear_stress: (optional, default=False) bool
+            return resolved shear stress
+        gamma_dots: (optional, default=False) bool
+            return slip system shear rates
+        velocity_gradient: (optional, default=False) bool
+            return plastic velocity_gradient, in the sample frame
         state_derivative: (optional, default=False) bool
             return state variable derivatives
+        chunk_size: (optional, default=DEFAULT_CHUNK_SIZE) int
+            number of points to process at a time
 
         Returns
         -------
         slipdata:
             namedtuple with requested data
         """
-        out_data = _SlipData()
+        npts = len(sstress)
+        if len(orientations) != npts:
+            raise ValueError("need one orientation for each stress")
+
+        out = dict()
+        for i0 in range(0, npts, chunk_size):
+            i1 = min(i0 + chunk_size, npts)
+            r = _rotation_matrices(orientations[i0:i1])
+            rt = r.transpose((0, 2, 1))
+            data = self.get(
+                rt @ sstress[i0:i1] @ r, state[i0:i1],
+                resolved_shear_stress=resolved_shear_stress,
+                gamma_dots=gamma_dots,
+                velocity_gradient=velocity_gradient,
+                state_derivative=state_derivative
+            )
+            if velocity_gradient:
+                data = data._replace(
+                    velocity_gradient=r @ data.velocity_gradient @ rt
+                )
 
-        rss = self.resolved_shear_stress(cstress)
-        if resolved_shear_stress:
-            out_data = out_data._replace(resolved_shear_stress=rss)
+            for name, value in data._asdict().items():
+                if value is None:
+                    continue
+                if name not in out:
+                    out[name] = np.empty(
+                        (npts,) + value.shape[1:], dtype=value.dtype
+                    )
+                out[name][i0:i1] = value
 
-        # Compute gamma dots if any other output is requested.
-        if gamma_dots or velocity_gradient or state_derivative:
-            gdots = self.model.gamma_dots(state, rss)
+        return _SlipData(**out)
 
-        if gamma_dots:
-            out_data = out_data._replace(gamma_dots=gdots)
 
-        if velocity_gradient:
-            vg = self.velocity_gradient(gdots)
-            out_data = out_data._replace(velocity_gradient=vg)
+def _takes_out(method):
+    """check whether a model method has an `out` argument"""
+    return "out" in inspect.signature(method).parameters
 
-        if state_derivative:
-            sd = self.model.state_derivative(state, gdots)
-            out_data = out_data._replace(state_derivative=sd)
 
-        return out_data
+def _rotation_matrices(orientations):
+    """rotation matrices from matrices or quaternions"""
+    orientations = np.asarray(orientations)
+    if orientations.shape[1:] == (3, 3):
+        return orientations
+    elif orientations.shape[1:] == (4,):
+        return quats.to_rmats(orientations)
+    else:
+        raise ValueError("orientations must be arrays of shape (n, 3, 3) "
+                         "or (n, 4)")
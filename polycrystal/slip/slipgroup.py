@@ -1,6 +1,8 @@
 """Groups of Slip Systems Related by Crystal Symmetry"""
 import numpy as np
 
+from ..utils.unique_vectors import unique_vectors
+
 
 class SlipGroup:
     """Group of symmetrically equivalent slip systems
@@ -27,7 +29,9 @@ class SlipGroup:
         self.n = n
         self.d = d
         self.csym = csym
+        # Read-only, since groups from `get_group` are shared.
         self._schmid = self._generate_ss()
+        self._schmid.setflags(write=False)
 
     def __len__(self):
         return len(self._schmid)
@@ -53,17 +57,15 @@ class SlipGroup:
         """Find slip systems unique up to a sign"""
         EPS = 1e-8
         nss = len(ss)
-        include = np.ones(nss, dtype=bool)
-        for i in range(nss):
-            if include[i]:
-                for j in range(i+1, nss):
-                    if include[j]:
-                        # Check slip system for equality up to sign.
-                        same = (
-                            np.allclose(ss[i], ss[j]) or
-                            np.allclose(ss[i], -ss[j])
-                        )
-                        if same:
-                            include[j] = False
+        flat = ss.reshape(nss, 9)
+
+        # Choose the sign making the first significant component positive,
+        # then keep the first occurrence of each tensor.
+        big = np.abs(flat) > 1e-6*np.abs(flat).max(axis=1, keepdims=True)
+        first = big.argmax(axis=1)
+        sgn = np.sign(flat[np.arange(nss), first])
+        _, index = unique_vectors(
+            flat*sgn[:, None], tol=EPS, return_index=True
+        )
 
-        return ss[include]
+        return ss[np.sort(index)]
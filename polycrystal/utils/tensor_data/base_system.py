@@ -10,9 +10,10 @@ class BaseSystem:
 
     registry = dict()
 
-    _s2 = np.sqrt(2)
+    # Python floats, so that float32 components are not upcast.
+    _s2 = float(np.sqrt(2))
     _s2i = 1 / _s2
-    _s3 = np.sqrt(3)
+    _s3 = float(np.sqrt(3))
     _s3i = 1 / _s3
 
     def __init__(self, matrices):
@@ -84,16 +85,17 @@ class BaseSystem:
         n = max(len_sym, len_skw)
         if n == 0:
             raise ValueError("all parts are None")
+        dtype = cls._parts_dtype(symm, skew)
 
         if len_sym == 0:
-            symm = np.zeros((n, dim_sym))
+            symm = np.zeros((n, dim_sym), dtype=dtype)
         else:
             if len_sym != n:
                 raise ValueError("symm and skew parts must have same length")
             symm = symm.reshape((n, dim_sym))
 
         if len_skw == 0:
-            skew = np.zeros((n, dim_skw))
+            skew = np.zeros((n, dim_skw), dtype=dtype)
         else:
             if len_skw != n:
                 raise ValueError("symm and skew parts must have same length")
@@ -106,6 +108,13 @@ class BaseSystem:
 
         return ten
 
+    @staticmethod
+    def _parts_dtype(*parts):
+        """floating point type of the given parts, float32 or wider"""
+        return np.result_type(
+            *(p for p in parts if p is not None), np.float32
+        )
+
     @staticmethod
     def _check_part(part, dim=None):
         """checks for expected input shape (2D) and length
@@ -36,17 +36,18 @@ class SymmDevSystem(BaseSystem):
         len = max(len_sym, len_skw, len_sph)
         if len == 0:
             raise ValueError("all parts are None")
+        dtype = cls._parts_dtype(symmdev, skew, sph)
 
         emsg = "symmdev, skew and spherical parts all must have same length"
         if len_sym == 0:
-            symmdev = np.zeros((len, dim_sym))
+            symmdev = np.zeros((len, dim_sym), dtype=dtype)
         else:
             if len_sym != len:
                 raise ValueError(emsg)
             symmdev = symmdev.reshape((len, dim_sym))
 
         if len_skw == 0:
-            skew = np.zeros((len, dim_skw))
+            skew = np.zeros((len, dim_skw), dtype=dtype)
         else:
             if len_skw != len:
                 raise ValueError(emsg)
@@ -54,7 +55,7 @@ class SymmDevSystem(BaseSystem):
             skew = skew.reshape((len, dim_skw))
 
         if len_sph == 0:
-            sph = np.zeros((len, 1))
+            sph = np.zeros((len, 1), dtype=dtype)
         else:
             if len_sph != len:
                 raise ValueError(emsg)
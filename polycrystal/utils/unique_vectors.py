@@ -61,21 +61,15 @@ def unique_vectors(
 def _to_ranks(a, tol=DEFAULT_TOL):
     """Change floats to ranks for each column"""
     nr, nc = a.shape
-    a_ind = a.argsort(axis=0)
     arank = np.zeros_like(a, dtype=int)
-    rnk = np.zeros(nr, dtype=int)
     for j in range(nc):
-        # rank values in each column
+        # rank values in each column: the rank increases at each gap in the
+        # sorted values larger than the tolerance
         col = a[:, j]
         ind = np.argsort(col)
         srt = col[ind]
-        rnk[0] = 0
-        for i in range(1,nr):
-            rnk[i] = rnk[i-1]
-            if np.abs(srt[i] - srt[i-1]) > tol:
-                rnk[i] += 1
-        #
-        inv = np.argsort(ind)
-        arank[:,j] = rnk[inv]
+        rnk = np.zeros(nr, dtype=int)
+        np.cumsum(np.diff(srt) > tol, out=rnk[1:])
+        arank[ind, j] = rnk
 
     return arank
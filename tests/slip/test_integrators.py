@@ -0,0 +1,232 @@
+"""Tests for time integration of slip crystals"""
+import pytest
+import numpy as np
+from scipy.integrate import solve_ivp
+
+from polycrystal.elasticity.single_crystal import SingleCrystal
+from polycrystal.slip import slip_groups
+from polycrystal.slip import slipcrystal
+from polycrystal.slip import integrators
+from polycrystal.slip.slip_models import (
+    AF_SingleHardness, AF_SingleHardnessParameters,
+    AF_ZeroBackStress, AF_ZeroBackStressParameters,
+    ArmstrongFrederickParameters, ArmstrongFrederick,
+)
+from polycrystal.slip.slip_models.abc import SlipModel
+from polycrystal.utils.tensor_data.mandel_system import MandelSystem
+
+
+NPTS = 20
+
+
+@pytest.fixture
+def stiffness():
+    """Cubic stiffness in MPa, Mandel components"""
+    return SingleCrystal(
+        "cubic", (200e3, 130e3, 200e3), system="MANDEL"
+    ).stiffness
+
+
+@pytest.fixture(
+    params=["single", "single_2d", "zero_backstress", "backstress"]
+)
+def crystal_and_state(request):
+    """Stiff (m = 0.05) FCC crystals and initial states for each model"""
+    rng = np.random.default_rng(3)
+    g = rng.uniform(80, 120, (NPTS, 12))
+    if request.param.startswith("single"):
+        model = AF_SingleHardness(
+            AF_SingleHardnessParameters(1e-3, 0.05, 200., 0.5)
+        )
+        state = g[:, :1] if request.param == "single_2d" else g[:, 0]
+    elif request.param == "zero_backstress":
+        model = AF_ZeroBackStress(
+            AF_ZeroBackStressParameters(1e-3, 0.05, 200., 0.5, 1.4)
+        )
+        state = g
+    else:
+        model = ArmstrongFrederick(
+            ArmstrongFrederickParameters(1e-3, 0.05, 200., 0.5, 100., 1., 1.4)
+        )
+        state = np.hstack((g, rng.uniform(-10, 10, (NPTS, 12))))
+
+    xtal = slipcrystal.SlipCrystal([slip_groups.get_group("fcc")], model)
+    return xtal, state
+
+
+@pytest.fixture
+def loading():
+    """Initial stresses and strain rates"""
+    rng = np.random.default_rng(4)
+    s = rng.standard_normal((2, NPTS, 3, 3))
+    s = s + s.transpose((0, 1, 3, 2))
+    return 50 * s[0], 1e-3 * s[1]
+
+
+class _NoDerivatives(SlipModel):
+
+    def num_statevar(self, num_slipsys):
+        return 1
+
+    def gamma_dots(self, state_var, rss, out=None):
+        return np.zeros_like(rss)
+
+    def state_derivative(self, state_var, gamdot, out=None):
+        return np.zeros(len(state_var))
+
+
+class TestBackwardEuler:
+
+    def test_residual(self, crystal_and_state, stiffness, loading):
+        """The update satisfies the backward Euler equations"""
+        xtal, state = crystal_and_state
+        s, edot = loading
+        dt = 1.0
+        be = integrators.BackwardEuler(xtal, stiffness, chunk_size=7)
+        data = be.update(s, state, dt*edot, dt)
+        assert data.converged.all()
+
+        rates = xtal.get(
+            data.stress, data.state, gamma_dots=True, state_derivative=True
+        )
+        sig = MandelSystem(data.stress).symm
+        sig_expected = MandelSystem(s).symm + (
+            dt * MandelSystem(edot).symm -
+            dt * rates.gamma_dots @ MandelSystem(xtal.schmid).symm
+        ) @ stiffness.T
+        assert np.allclose(sig, sig_expected, rtol=0, atol=1e-4)
+        assert np.allclose(
+            data.state, state + dt * rates.state_derivative,
+            rtol=0, atol=1e-5
+        )
+
+    def test_jacobian(self, crystal_and_state, stiffness, loading):
+        """The Jacobian from compressed derivatives matches dense ones"""
+        xtal, state = crystal_and_state
+        s, _ = loading
+        model = xtal.model
+        be = integrators.BackwardEuler(xtal, stiffness)
+        dt = 0.1
+        sig = MandelSystem(s).symm
+        sv = state.reshape(NPTS, -1)
+        rss = sig @ be._rss_6
+        gdots = model.gamma_dots(sv, rss)
+        jac = be._jacobian(sig, sv, gdots, dt)
+
+        g_rss, g_sv = model.gamma_dots_jacobian(sv, rss)
+        f_sv, f_gd = model.state_derivative_jacobian(sv, gdots)
+        g_sig = g_rss[:, :, None] * be._rss_6.T
+        c_pt = stiffness @ MandelSystem(xtal.schmid).symm.T
+        expected = np.block([
+            [dt * c_pt @ g_sig, dt * c_pt @ g_sv],
+            [-dt * f_gd @ g_sig, -dt * (f_sv + f_gd @ g_sv)]
+        ]) + np.identity(6 + sv.shape[1])
+        assert np.allclose(jac, expected)
+
+    def test_large_steps(self, crystal_and_state, stiffness, loading):
+        """Few implicit steps match many explicit ones"""
+        xtal, state = crystal_and_state
+        _, edot = loading
+        s = np.zeros((NPTS, 3, 3))
+        tmax = 5.0
+
+        be = integrators.BackwardEuler(xtal, stiffness)
+        s_imp, sv_imp = s, state
+        for _ in range(10):
+            data = be.update(s_imp, sv_imp, 0.1*tmax*edot, 0.1*tmax)
+            assert data.converged.all()
+            s_imp, sv_imp = data.stress, data.state
+
+        nsteps = 2000
+        dt = tmax/nsteps
+        p = MandelSystem(xtal.schmid).symm
+        sig, sv = MandelSystem(s).symm, state
+        eps_dot = MandelSystem(edot).symm
+        for _ in range(nsteps):
+            rates = xtal.get(
+                MandelSystem.from_parts(symm=sig).matrices, sv,
+                gamma_dots=True, state_derivative=True
+            )
+            sig = sig + dt * (eps_dot - rates.gamma_dots @ p) @ stiffness.T
+            sv = sv + dt * rates.state_derivative
+
+        assert np.allclose(
+            MandelSystem(s_imp).symm, sig, rtol=0,
+            atol=1e-3 * np.abs(sig).max()
+        )
+        assert np.allclose(
+            sv_imp, sv, rtol=0, atol=1e-3 * np.abs(sv).max()
+        )
+
+    def test_no_derivatives(self, stiffness, loading):
+        xtal = slipcrystal.SlipCrystal(
+            [slip_groups.get_group("fcc")], _NoDerivatives()
+        )
+        s, edot = loading
+        be = integrators.BackwardEuler(xtal, stiffness)
+        with pytest.raises(NotImplementedError):
+            be.update(s + 1., np.ones(NPTS), edot, 1.0)
+
+
+class TestRK23:
+
+    @pytest.fixture
+    def stresses(self):
+        """Stresses from zero to somewhat above the hardness"""
+        rng = np.random.default_rng(5)
+        s = rng.standard_normal((NPTS, 3, 3))
+        s = s + s.transpose((0, 2, 1))
+        s *= np.linspace(0, 60, NPTS).reshape(NPTS, 1, 1)
+        return s
+
+    def test_accuracy(self, crystal_and_state, stresses):
+        """Results agree with an implicit scipy solution"""
+        xtal, state = crystal_and_state
+        tmax = 10.
+        data = integrators.RK23(xtal).integrate(stresses, state, tmax)
+        assert data.success.all()
+
+        # Points without stress take a single step.
+        assert data.steps[0] == 1
+        assert data.steps.max() > 10
+
+        shp = state.shape[1:]
+        for i in (0, NPTS//2, NPTS - 1):
+            def f(t, y):
+                return xtal.get(
+                    stresses[i:i+1], y.reshape((1,) + shp),
+                    state_derivative=True
+                ).state_derivative.ravel()
+
+            ref = solve_ivp(
+                f, (0., tmax), state[i].ravel(), method="Radau",
+                rtol=1e-10, atol=1e-10
+            )
+            assert np.allclose(
+                data.state[i].ravel(), ref.y[:, -1],
+                rtol=0, atol=1e-5 * np.abs(ref.y[:, -1]).max()
+            )
+
+    def test_gammadot_max(self, stiffness):
+        """Capped rates give linear hardening for large stresses"""
+        model = AF_SingleHardness(
+            AF_SingleHardnessParameters(1e-3, 0.05, 200., 0.)
+        )
+        model.gammadot_max = 1.0
+        xtal = slipcrystal.SlipCrystal([slip_groups.get_group("fcc")], model)
+
+        # Shear stress in the 1-2 plane has 8 active FCC slip systems.
+        s = np.zeros((2, 3, 3))
+        s[:, 0, 1] = s[:, 1, 0] = 1e4
+        g0 = np.array([100., 150.])
+        data = integrators.RK23(xtal).integrate(s, g0, 1.0)
+        assert data.success.all()
+        assert np.allclose(data.state, g0 + 200. * 8 * 1.0)
+
+    def test_max_steps(self, crystal_and_state, stresses):
+        xtal, state = crystal_and_state
+        data = integrators.RK23(xtal, max_steps=3).integrate(
+            stresses, state, 10.
+        )
+        assert data.success[0] and not data.success.all()
+        assert data.steps.max() == 3
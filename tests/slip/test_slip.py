@@ -3,13 +3,17 @@ import pytest
 import numpy as np
 
 from polycrystal.orientations import crystalsymmetry
+from polycrystal.orientations import quaternions
 from polycrystal.slip import slipgroup
 from polycrystal.slip import slipcrystal
+from polycrystal.utils.tensor_data.symmdev_system import SymmDevSystem
 from polycrystal.slip.slip_models import (
     AF_SingleHardness, AF_SingleHardnessParameters,
     AF_ZeroBackStress, AF_ZeroBackStressParameters,
     ArmstrongFrederickParameters, ArmstrongFrederick,
+    DiagonalBlocks, StackedBlocks,
 )
+from polycrystal.slip.slip_models.abc import _batch_diag
 
 
 @pytest.fixture
@@ -124,6 +128,308 @@ class TestSlipCrystal:
         )
 
 
+class TestSampleFrame:
+
+    @pytest.fixture
+    def fcc_bcc_crystal(self, slip_fcc, slip_bcc, af_single_hardness_model):
+        return slipcrystal.SlipCrystal(
+            [slip_fcc, slip_bcc], af_single_hardness_model
+        )
+
+    @pytest.fixture
+    def points(self):
+        """Stresses, states and orientations at 7 points"""
+        rng = np.random.default_rng(5)
+        s = rng.standard_normal((7, 3, 3))
+        q = quaternions.random_quats(7, rng=6)
+        return s + s.transpose((0, 2, 1)), rng.uniform(1, 2, 7), q
+
+    def test_groups(self, fcc_bcc_crystal):
+        assert fcc_bcc_crystal.num_slipsys == 24
+
+    def test_get_sample_frame(self, fcc_bcc_crystal, points):
+        xtal = fcc_bcc_crystal
+        sstress, state, q = points
+        r = quaternions.to_rmats(q)
+        kwargs = dict(
+            resolved_shear_stress=True, gamma_dots=True,
+            velocity_gradient=True, state_derivative=True
+        )
+        data = xtal.get_sample_frame(sstress, state, r, **kwargs)
+
+        for i in range(len(state)):
+            cstress = r[i].T @ sstress[i] @ r[i]
+            data_i = xtal.get(cstress[None], state[i:i+1], **kwargs)
+            assert np.allclose(
+                data.resolved_shear_stress[i], data_i.resolved_shear_stress
+            )
+            assert np.allclose(data.gamma_dots[i], data_i.gamma_dots)
+            assert np.allclose(
+                data.velocity_gradient[i],
+                r[i] @ data_i.velocity_gradient[0] @ r[i].T
+            )
+            assert np.allclose(
+                data.state_derivative[i], data_i.state_derivative
+            )
+
+        # Quaternions and chunks give the same results.
+        data_q = xtal.get_sample_frame(
+            sstress, state, q, chunk_size=3, **kwargs
+        )
+        for a, b in zip(data, data_q):
+            assert np.allclose(a, b)
+
+        data = xtal.get_sample_frame(sstress, state, q, gamma_dots=True)
+        assert data.gamma_dots is not None and data.velocity_gradient is None
+
+    def test_bad_orientations(self, fcc_bcc_crystal, points):
+        sstress, state, q = points
+        with pytest.raises(ValueError):
+            fcc_bcc_crystal.get_sample_frame(sstress, state, q[:, :3])
+        with pytest.raises(ValueError):
+            fcc_bcc_crystal.get_sample_frame(sstress, state, q[:3])
+
+
+class TestFusedKernel:
+
+    @pytest.fixture(params=[
+        "af_single_hardness_model", "af_zero_backstress_model",
+        "armstrong_frederick_model"
+    ])
+    def crystal_and_state(self, request, slip_fcc, slip_bcc):
+        """Crystals for each model, with stresses and states at 50 points"""
+        model = request.getfixturevalue(request.param)
+        model.gammadot_max = 2.0
+        xtal = slipcrystal.SlipCrystal([slip_fcc, slip_bcc], model)
+        rng = np.random.default_rng(7)
+        npts, nsv = 50, xtal.num_statevar
+        s = rng.standard_normal((npts, 3, 3))
+        state = rng.uniform(1, 2, (npts, nsv))
+        if isinstance(model, ArmstrongFrederick):
+            state[:, nsv//2:] -= 1.5
+        return xtal, s, state
+
+    def test_get(self, crystal_and_state):
+        """Blocks and buffers give the unfused results"""
+        xtal, s, state = crystal_and_state
+        model = xtal.model
+        rss = SymmDevSystem(s).symmdev @ xtal.schmid_5.T
+        gdots = model.gamma_dots(state, rss)
+        expected = (
+            rss, gdots, np.einsum("ij,jkl->ikl", gdots, xtal.schmid),
+            model.state_derivative(state, gdots).reshape(state.shape)
+        )
+
+        kwargs = dict(
+            resolved_shear_stress=True, gamma_dots=True,
+            velocity_gradient=True, state_derivative=True
+        )
+        out = xtal.work_buffers(state)
+        data = xtal.get(s, state, out=out, block_size=16, **kwargs)
+        for a, b, c in zip(data, out, expected):
+            assert a is b
+            assert np.allclose(a, c)
+
+        data = xtal.get(s, state, block_size=7, state_derivative=True)
+        assert data.gamma_dots is None
+        assert np.allclose(data.state_derivative, expected[3])
+
+    def test_flat_state(self, af_single_hardness_model, slip_fcc):
+        """A single state variable may be given as (npts) or (npts, 1)"""
+        xtal = slipcrystal.SlipCrystal([slip_fcc], af_single_hardness_model)
+        rng = np.random.default_rng(8)
+        s = rng.standard_normal((50, 3, 3))
+        state = rng.uniform(1, 2, (50, 1))
+        data = xtal.get(s, state, block_size=16, state_derivative=True)
+        flat = xtal.get(s, state[:, 0], block_size=16, state_derivative=True)
+        assert data.state_derivative.shape == (50, 1)
+        assert flat.state_derivative.shape == (50,)
+        assert np.array_equal(
+            data.state_derivative[:, 0], flat.state_derivative
+        )
+
+    def test_legacy_model(self, afsh_params, slip_fcc):
+        """Models without `out` arguments give the same results"""
+        class Legacy(AF_SingleHardness):
+            def gamma_dots(self, state_var, rss):
+                return super().gamma_dots(state_var, rss)
+
+            def state_derivative(self, state_var, gamdot):
+                return super().state_derivative(state_var, gamdot)
+
+        rng = np.random.default_rng(9)
+        s = rng.standard_normal((50, 3, 3))
+        state = rng.uniform(1, 2, (50, 1))
+        kwargs = dict(gamma_dots=True, state_derivative=True, block_size=16)
+        data = slipcrystal.SlipCrystal(
+            [slip_fcc], AF_SingleHardness(afsh_params)
+        ).get(s, state, **kwargs)
+        legacy = slipcrystal.SlipCrystal(
+            [slip_fcc], Legacy(afsh_params)
+        ).get(s, state, **kwargs)
+        for a, b in zip(data, legacy):
+            assert np.array_equal(a, b)
+
+        # The model can be replaced after construction.
+        xtal = slipcrystal.SlipCrystal(
+            [slip_fcc], AF_SingleHardness(afsh_params)
+        )
+        xtal.model = Legacy(afsh_params)
+        for a, b in zip(data, xtal.get(s, state, **kwargs)):
+            assert np.array_equal(a, b)
+
+    def test_single_stress(self, crystal_and_state):
+        """A single (3, 3) stress is a single point"""
+        xtal, s, state = crystal_and_state
+        rss = xtal.resolved_shear_stress(s[0])
+        assert rss.shape == (1, xtal.num_slipsys)
+        assert np.allclose(rss, xtal.resolved_shear_stress(s[:1]))
+
+        kwargs = dict(
+            resolved_shear_stress=True, gamma_dots=True,
+            velocity_gradient=True, state_derivative=True
+        )
+        data = xtal.get(s[0], state[:1], **kwargs)
+        for a, b in zip(data, xtal.get(s[:1], state[:1], **kwargs)):
+            assert np.allclose(a, b)
+
+    def test_dtype(self, crystal_and_state):
+        """Outputs are allocated with the type of the inputs"""
+        xtal, s, state = crystal_and_state
+        kwargs = dict(
+            resolved_shear_stress=True, gamma_dots=True,
+            velocity_gradient=True, state_derivative=True
+        )
+        data = xtal.get(
+            s.astype(np.float32), state.astype(np.float32), **kwargs
+        )
+        expected = xtal.get(s, state, **kwargs)
+        for a, b in zip(data, expected):
+            assert a.dtype == np.float32
+            assert np.allclose(a, b, rtol=1e-4, atol=1e-4)
+
+    def test_bad_buffer(self, crystal_and_state):
+        xtal, s, state = crystal_and_state
+        out = xtal.work_buffers(state[:10])
+        with pytest.raises(ValueError):
+            xtal.get(s, state, gamma_dots=True, out=out)
+
+    def test_model_out(self, crystal_and_state):
+        xtal, s, state = crystal_and_state
+        rss = xtal.resolved_shear_stress(s)
+        gdots = np.empty_like(rss)
+        assert xtal.model.gamma_dots(state, rss, out=gdots) is gdots
+        assert np.array_equal(gdots, xtal.model.gamma_dots(state, rss))
+        assert np.all(np.abs(gdots) <= 2.0 + 1e-12)
+
+
+class TestJacobians:
+
+    @pytest.fixture(params=[
+        "af_single_hardness_model", "af_zero_backstress_model",
+        "armstrong_frederick_model"
+    ])
+    def model_and_point(self, request):
+        """Models with states, rss and gamma dots at 4 points and 3 slips"""
+        model = request.getfixturevalue(request.param)
+        model.gammadot_max = 0.3
+        rng = np.random.default_rng(11)
+        npts, nslip = 4, 3
+        nsv = model.num_statevar(nslip)
+        state = rng.uniform(1, 2, (npts, nsv))
+        if isinstance(model, ArmstrongFrederick):
+            state[:, nslip:] -= 1.5
+        rss = rng.uniform(-2.5, 2.5, (npts, nslip))
+        return model, state, rss, rng.uniform(-1, 1, (npts, nslip))
+
+    @staticmethod
+    def _fd(f, x, h=1e-6):
+        """central differences of f (npts, k) in x (npts, l): (npts, k, l)"""
+        cols = []
+        for j in range(x.shape[1]):
+            dx = np.zeros_like(x)
+            dx[:, j] = h
+            cols.append((f(x + dx) - f(x - dx))/(2*h))
+        return np.stack(cols, axis=2)
+
+    def test_gamma_dots(self, model_and_point):
+        model, state, rss, _ = model_and_point
+        d_rss, d_state = model.gamma_dots_jacobian(state, rss)
+
+        fd = self._fd(lambda t: model.gamma_dots(state, t), rss)
+        assert np.allclose(fd, d_rss[:, :, None]*np.identity(rss.shape[1]))
+        fd = self._fd(lambda s: model.gamma_dots(s, rss), state)
+        assert np.allclose(fd, d_state)
+
+    def test_state_derivative(self, model_and_point):
+        model, state, _, gdots = model_and_point
+        d_state, d_gamdot = model.state_derivative_jacobian(state, gdots)
+
+        def f(s, g):
+            return model.state_derivative(s, g).reshape(len(s), -1)
+
+        assert np.allclose(self._fd(lambda s: f(s, gdots), state), d_state)
+        assert np.allclose(self._fd(lambda g: f(state, g), gdots), d_gamdot)
+
+    def test_compressed(self, model_and_point):
+        """State derivatives are diagonal blocks for per-slip state"""
+        model, state, rss, gdots = model_and_point
+        _, gd_state = model.gamma_dots_tangent(state, rss)
+        sd_state, sd_gamdot = model.state_derivative_tangent(state, gdots)
+        if isinstance(model, AF_SingleHardness):
+            assert gd_state.shape == (4, 3, 1)
+            assert sd_state.shape == (4, 1, 1)
+        else:
+            nfld = state.shape[1] // 3
+            assert isinstance(gd_state, DiagonalBlocks)
+            assert gd_state.diagonals.shape == (4, 1, nfld, 3)
+            assert isinstance(sd_state, DiagonalBlocks)
+            assert sd_state.diagonals.shape == (4, nfld, nfld, 3)
+        if isinstance(model, ArmstrongFrederick):
+            assert isinstance(sd_gamdot, StackedBlocks)
+            assert isinstance(sd_gamdot.blocks[1], DiagonalBlocks)
+
+    def test_diagonal_blocks(self):
+        rng = np.random.default_rng(12)
+        blocks = DiagonalBlocks(rng.standard_normal((5, 2, 3, 4)))
+        dense = blocks.dense()
+        assert dense.shape == blocks.shape == (5, 8, 12)
+        assert np.array_equal(
+            dense[:, 4:, 8:], _batch_diag(blocks.diagonals[:, 1, 2])
+        )
+        assert np.count_nonzero(dense) == 5 * 2 * 3 * 4
+
+        v = rng.standard_normal((5, 12))
+        assert np.allclose(blocks.matmul(v), (dense @ v[:, :, None])[:, :, 0])
+        b = rng.standard_normal((5, 12, 7))
+        assert np.allclose(blocks.matmul(b), dense @ b)
+
+        other = DiagonalBlocks(rng.standard_normal((5, 3, 1, 4)))
+        prod = blocks.matmul(other)
+        assert isinstance(prod, DiagonalBlocks)
+        assert np.allclose(prod.dense(), dense @ other.dense())
+
+        a = rng.standard_normal((7, 8))
+        assert np.allclose(blocks.rmatmul(a), a @ dense)
+        a = rng.standard_normal((5, 7, 8))
+        assert np.allclose(blocks.rmatmul(a), a @ dense)
+
+    def test_stacked_blocks(self):
+        rng = np.random.default_rng(13)
+        top = rng.standard_normal((5, 3, 4))
+        bottom = DiagonalBlocks(rng.standard_normal((5, 1, 1, 4)))
+        stacked = StackedBlocks([top, bottom])
+        dense = stacked.dense()
+        assert dense.shape == stacked.shape == (5, 7, 4)
+        assert np.array_equal(dense[:, :3], top)
+        assert np.array_equal(dense[:, 3:], bottom.dense())
+
+        b = rng.standard_normal((5, 4, 6))
+        assert np.allclose(stacked.matmul(b), dense @ b)
+        b = DiagonalBlocks(rng.standard_normal((5, 1, 2, 4)))
+        assert np.allclose(stacked.matmul(b), dense @ b.dense())
+
+
 @pytest.fixture
 def afsh_params():
     return AF_SingleHardnessParameters(
@@ -43,3 +43,50 @@ class TestSlipGroups:
             for t in group.schmid:
                 for i in range(len(t)):
                     assert np.dot(t[i, :], t[:, 0]) == pytest.approx(0.0)
+
+    def test_unique(self):
+        """Schmid tensors are unique up to sign"""
+        for name, cbya in (('bcc:123', None), ('hcp:pyramidal_c+a', 1.6)):
+            group = slip_groups.get_group(name, cbya)
+            flat = group.schmid.reshape(len(group), 9)
+            dots = np.abs(flat @ flat.T)
+            assert np.allclose(np.diag(dots), 1.0)
+            off_diagonal = ~np.identity(len(group), dtype=bool)
+            assert np.all(dots[off_diagonal] < 1 - 1e-6)
+
+        # Repeated and negated tensors are removed, keeping the first.
+        group = slip_groups.get_group('fcc')
+        ss = np.concatenate((group.schmid, -group.schmid, group.schmid))
+        assert np.array_equal(group._unique_ss(ss), group.schmid)
+
+    def test_readonly(self):
+        """Schmid tensors of shared groups are read-only"""
+        g1 = slip_groups.get_group('hcp:pyramidal_c+a', 1.7)
+        g2 = slip_groups.get_group('hcp:pyramidal_c+a', 1.6)
+        assert not np.allclose(g1.schmid, g2.schmid)
+        with pytest.raises(ValueError):
+            g1.schmid[0, 0, 0] = 1.0
+
+    def test_group_cache(self):
+        """Groups are cached by name and c/a ratio"""
+        slip_groups.cache_clear()
+        g1 = slip_groups.get_group('hcp:prismatic', 1.6)
+        g2 = slip_groups.get_group('hcp:prismatic', 1.6 + 1e-12)
+        g3 = slip_groups.get_group('hcp:prismatic', 1.7)
+        assert g1 is g2
+        assert g1 is not g3
+        assert slip_groups.get_group('fcc') is slip_groups.get_group('fcc')
+
+        info = slip_groups.cache_info()
+        assert info.hits == 2
+        assert info.misses == 3
+        assert info.currsize == 3
+
+        assert info.maxsize == slip_groups.CACHE_SIZE
+
+        slip_groups.cache_clear()
+        assert slip_groups.cache_info().currsize == 0
+        g4 = slip_groups.get_group('hcp:prismatic', 1.6)
+        assert g4 is not g1
+        assert g4.schmid is not g1.schmid
+        assert np.array_equal(g4.schmid, g1.schmid)
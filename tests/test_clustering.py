@@ -0,0 +1,77 @@
+"""Unit tests for clustering module
+"""
+import unittest
+
+import numpy as np
+
+from polycrystal.orientations import crystalsymmetry as cs
+from polycrystal.orientations import quaternions as quats
+from polycrystal.orientations import clustering
+
+
+class TestClustering(unittest.TestCase):
+    """TestClustering"""
+
+    def setUp(self):
+        # Grid of 3 x 4 x 5 voxels, with one grain for each value of the first
+        # index; orientations are scattered by small rotations about a grain
+        # orientation and by cubic symmetries.
+        self.sym = cs.get_symmetries('cubic')
+        self.shape = (3, 4, 5)
+        n = np.prod(self.shape)
+        self.grains = np.repeat(np.arange(3), n // 3)
+        qgrain = quats.random_quats(3)
+        wsmall = 0.01 * np.linspace(-1, 1, 3*n).reshape(n, 3)
+        qsymm = self.sym.quats[np.arange(n) % self.sym.nsymm]
+        self.q = quats.multiply(
+            quats.multiply(qgrain[self.grains], quats.from_exp(wsmall)), qsymm
+        )
+
+    def test_grid_neighbor_pairs(self):
+        """face neighbors on a grid"""
+        i, j = clustering.grid_neighbor_pairs((2, 3))
+        pairs = set(zip(i, j))
+        expected = {(0, 3), (1, 4), (2, 5), (0, 1), (1, 2), (3, 4), (4, 5)}
+        self.assertEqual(pairs, expected)
+
+    def test_cluster_neighbors(self):
+        """clusters of spatial neighbors"""
+        pairs = clustering.grid_neighbor_pairs(self.shape)
+        labels = clustering.cluster_orientations(
+            self.q, self.sym, np.radians(5.), pairs=pairs, chunk_size=17
+        )
+        self.assertTrue(np.array_equal(labels, self.grains))
+
+    def test_cluster_all(self):
+        """clusters without spatial neighbors"""
+        labels = clustering.cluster_orientations(
+            self.q, self.sym, np.radians(5.), chunk_size=17
+        )
+        self.assertTrue(np.array_equal(labels, self.grains))
+
+        labels = clustering.cluster_orientations(self.q, self.sym, 0.)
+        self.assertTrue(np.array_equal(labels, np.arange(len(self.q))))
+
+    def test_cluster_paths_agree(self):
+        """all pairs give the same clusters as an explicit list of pairs"""
+        q = quats.random_quats(500, rng=7)
+        pairs = np.triu_indices(len(q), 1)
+        for threshold in (0.05, 0.1, 0.15):
+            labels = clustering.cluster_orientations(
+                q, self.sym, threshold, chunk_size=100
+            )
+            labels_pairs = clustering.cluster_orientations(
+                q, self.sym, threshold, pairs=pairs
+            )
+            self.assertTrue(np.array_equal(labels, labels_pairs))
+
+        # Links are strictly below the threshold.
+        q = np.vstack((q, q))
+        pairs = (np.arange(500), np.arange(500, 1000))
+        for p in (None, pairs):
+            labels = clustering.cluster_orientations(q, self.sym, 0., pairs=p)
+            self.assertTrue(np.array_equal(labels, np.arange(len(q))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
 """Unit testing for quaternions module
 """
+import os
+import tempfile
 import unittest
 import numpy as np
 
+from polycrystal.orientations import quaternions as quats
+from polycrystal.orientations import conventions
 from polycrystal.orientations.conventions import baseclass
 from polycrystal.orientations.conventions import euler
 from polycrystal.orientations.conventions import expmap
@@ -56,6 +60,21 @@ class TestEulerAngles(unittest.TestCase):
         rmat = ea.to_rmats(a)
         self.assertTrue(np.linalg.norm(rmat - r) < 1.0e-12)
 
+    def test_from_rmats(self):
+        """round trip, including gimbal lock"""
+        ea = euler.EulerAngles()
+        r = quats.random_rmats(20)
+        a = ea.from_rmats(r)
+        self.assertTrue(np.all((a >= 0.) & (a < 360.)))
+        self.assertTrue(np.all(a[:, 1] <= 180.))
+        self.assertTrue(np.linalg.norm(ea.to_rmats(a) - r) < 1.0e-12)
+
+        a = np.array([[30., 0., 20.], [30., 180., 20.], [10., 90., 40.]])
+        a_r = ea.from_rmats(ea.to_rmats(a))
+        self.assertTrue(
+            np.allclose(a_r, [[50., 0., 0.], [10., 180., 0.], a[2]])
+        )
+
 
 class TestExpMap(unittest.TestCase):
 
@@ -85,5 +104,110 @@ class TestExpMap(unittest.TestCase):
         self.assertTrue(np.linalg.norm(rmat - r) < 1.0e-12)
 
 
+    def test_from_rmats(self):
+        """round trip, including small and 180 degree angles"""
+        conv = expmap.ExpMap()
+        w = np.array([
+            [0., 0., 0.],
+            [1e-10, 0., -1e-10],
+            [0.3, -0.2, 0.1],
+            [0., np.pi, 0.],
+        ])
+        w_r = conv.from_rmats(conv.to_rmats(w))
+        self.assertTrue(np.linalg.norm(w_r - w) < 1.0e-12)
+
+        r = quats.random_rmats(20)
+        w = conv.from_rmats(r)
+        self.assertTrue(np.all(np.linalg.norm(w, axis=1) <= np.pi))
+        self.assertTrue(np.linalg.norm(conv.to_rmats(w) - r) < 1.0e-12)
+
+
+class TestConvert(unittest.TestCase):
+
+    def test_convert(self):
+        """round trips through all pairs of conventions"""
+        q = quats.random_quats(10)
+        q[q[:, 0] < 0] *= -1
+        for conv in conventions.conventions():
+            a = conventions.convert(q, 'quaternions', conv)
+            for conv2 in conventions.conventions():
+                a2 = conventions.convert(a, conv, conv2)
+                q2 = conventions.convert(a2, conv2, 'quaternions')
+                self.assertTrue(np.linalg.norm(q2 - q) < 1.0e-12)
+
+    def test_direct_converters(self):
+        """direct conversions agree with conversion through matrices"""
+        q = quats.random_quats(10)
+        for (conv1, conv2), func in conventions.converters.items():
+            a1 = conventions.convert(q, 'quaternions', conv1)
+            r1 = conventions.to_rmats(a1, conv1)
+            a2 = func(a1)
+            a2_r = conventions.from_rmats(r1, conv2)
+            self.assertTrue(np.allclose(a2, a2_r), msg=f"{conv1}->{conv2}")
+
+    def test_euler_gimbal_lock(self):
+        """direct conversion from quaternions with gimbal lock"""
+        a = np.array([[30., 0., 20.], [30., 180., 20.]])
+        q = conventions.convert(a, 'euler-angles', 'quaternions')
+        a_q = conventions.convert(q, 'quaternions', 'euler-angles')
+        self.assertTrue(np.allclose(a_q, [[50., 0., 0.], [10., 180., 0.]]))
+
+
+class TestConvertFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ea = conventions.convert(
+            quats.random_quats(25), 'quaternions', 'euler-angles'
+        )
+        self.q = conventions.convert(self.ea, 'euler-angles', 'quaternions')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_npy(self):
+        src, dest = self._path('ea.npy'), self._path('q.npy')
+        np.save(src, self.ea)
+        out = conventions.convert_file(
+            src, 'euler-angles', 'quaternions', dest, chunk_size=7
+        )
+        self.assertTrue(isinstance(out, np.memmap))
+        self.assertTrue(np.allclose(np.load(dest), self.q))
+
+    def test_npz(self):
+        src, dest = self._path('ea.npz'), self._path('q.npy')
+        np.savez_compressed(src, ea=self.ea, other=np.zeros(3))
+        conventions.convert_file(
+            src, 'euler-angles', 'quaternions', dest, chunk_size=7, key='ea'
+        )
+        self.assertTrue(np.allclose(np.load(dest), self.q))
+
+        with self.assertRaises(ValueError):
+            conventions.convert_file(src, 'euler-angles', 'quaternions', dest)
+
+    def test_text(self):
+        src = self._path('ea.txt')
+        np.savetxt(src, self.ea, header='Euler angles')
+        out = np.zeros((25, 4))
+        conventions.convert_file(
+            src, 'euler-angles', 'quaternions', out, chunk_size=7
+        )
+        self.assertTrue(np.allclose(out, self.q))
+
+    def test_bad_dest(self):
+        src = self._path('ea.npy')
+        np.save(src, self.ea)
+        for shape in ((30, 4), (20, 4), (25, 3)):
+            out = np.zeros(shape)
+            with self.assertRaises(ValueError):
+                conventions.convert_file(
+                    src, 'euler-angles', 'quaternions', out, chunk_size=7
+                )
+            self.assertFalse(out.any())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -36,6 +36,31 @@ class TestCrystalSymmetry(unittest.TestCase):
         self.assertTrue(np.allclose(r[1], r180y))
         # self.assertAlmostEqual(err.max(), 0., msg=msg)
 
+    def test_group_tables(self):
+        """multiplication and inverse tables"""
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            ns = sym.nsymm
+            i, j = np.meshgrid(np.arange(ns), np.arange(ns), indexing='ij')
+            k = sym.compose(i, j)
+            prod = quats.multiply(sym.quats[i.flat], sym.quats[j.flat])
+            dots = np.abs(np.sum(prod * sym.quats[k.flat], axis=1))
+            msg = 'multiplication table failed for: %s' % n
+            self.assertAlmostEqual(np.abs(dots - 1.).max(), 0., msg=msg)
+
+            inv = sym.inverse_table
+            msg = 'inverse table failed for: %s' % n
+            self.assertTrue(np.all(sym.compose(np.arange(ns), inv) == 0), msg)
+            self.assertTrue(np.all(sym.compose(inv, np.arange(ns)) == 0), msg)
+
+    def test_readonly(self):
+        """cached operators are not writeable"""
+        sym = cs.get_symmetries('cubic')
+        self.assertTrue(sym.rmats is sym.rmats)
+        for a in (sym.quats, sym.rmats, sym.multiplication_table):
+            with self.assertRaises(ValueError):
+                a[0] = 0
+
     def test_to_fundamental_region(self):
         """testing referral to fundamental region"""
         id = quats.identity()
@@ -47,6 +72,21 @@ class TestCrystalSymmetry(unittest.TestCase):
               ' symmetries: %s' % n
             self.assertAlmostEqual(err.max(), 0., msg=msg)
 
+    def test_to_fundamental_region_chunks(self):
+        """batched reduction agrees with orientation-by-orientation loop"""
+        q = quats.random_quats(100)
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            qfr_loop = np.zeros_like(q)
+            for i in range(len(q)):
+                qeqv = quats.multiply(q[i], sym.quats)
+                j = np.abs(qeqv[:, 0]).argmax()
+                qfr_loop[i] = np.sign(qeqv[j, 0]) * qeqv[j]
+            qfr = sym.to_fundamental_region(q, chunk_size=7)
+            err = np.linalg.norm(qfr - qfr_loop, axis=1)
+            msg = 'batched fundamental region failed for: %s' % n
+            self.assertAlmostEqual(err.max(), 0., msg=msg)
+
     def test_average(self):
         """average orientation"""
         id = quats.identity()
@@ -68,6 +108,59 @@ class TestCrystalSymmetry(unittest.TestCase):
         err = np.linalg.norm(avg - id, axis=1)
         self.assertAlmostEqual(err.max(), 0., msg=msg)
 
+    def test_average_orientations(self):
+        """grouped averages agree with averages of each group"""
+        q = quats.random_quats(30)
+        labels = np.array([7, 2, 5] * 10)
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            msg = 'grouped average failed for symmetries: %s' % n
+            ulabels, qavg = sym.average_orientations(q, labels)
+            self.assertTrue(np.array_equal(ulabels, [2, 5, 7]), msg=msg)
+            for lbl, qa in zip(ulabels, qavg):
+                qa_1 = sym.average_orientation(q[labels == lbl])
+                err = np.linalg.norm(qa - qa_1)
+                self.assertAlmostEqual(err, 0., msg=msg)
+
+        msg = 'Markley average failed for near-identity case'
+        ndeg = 5.
+        theta = 0.5*ndeg*np.pi/180.
+        q = np.zeros((6,4))
+        q[:,0] = np.cos(theta)
+        q[0:3,1:] = np.sin(theta)*np.identity(3)
+        q[3:6,1:] = -np.sin(theta)*np.identity(3)
+        _, avg = self.hsym.average_orientations(
+            q, np.zeros(6, dtype=int), method='markley'
+        )
+        err = np.linalg.norm(avg - quats.identity(), axis=1)
+        self.assertAlmostEqual(err.max(), 0., msg=msg)
+
+        # No orientations give no groups.
+        for method in ('mean', 'markley'):
+            ulabels, avg = self.hsym.average_orientations(
+                np.zeros((0, 4)), np.zeros(0, dtype=int), method=method
+            )
+            self.assertEqual(ulabels.shape, (0,))
+            self.assertEqual(avg.shape, (0, 4))
+
+    def test_float32(self):
+        """float32 orientations give float32 results"""
+        q = quats.random_quats(40, rng=5)
+        q32 = q.astype(np.float32)
+        i, j = np.arange(20), np.arange(20, 40)
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            msg = 'float32 results failed for symmetries: %s' % n
+            qfr = sym.to_fundamental_region(q32)
+            self.assertEqual(qfr.dtype, np.float32, msg=msg)
+            err = np.abs(qfr - sym.to_fundamental_region(q)).max()
+            self.assertLess(err, 1e-6, msg=msg)
+            _, qavg = sym.average_orientations(q32, np.arange(40) % 3)
+            self.assertEqual(qavg.dtype, np.float32, msg=msg)
+            angles, axes = sym.pair_misorientations(q32, i, j)
+            self.assertEqual(angles.dtype, np.float32, msg=msg)
+            self.assertEqual(axes.dtype, np.float32, msg=msg)
+
     def test_misorientation(self):
         """misorientation"""
         delta = np.array([1,2,4])
@@ -83,6 +176,63 @@ class TestCrystalSymmetry(unittest.TestCase):
         err = np.linalg.norm(mis - q, axis=1)
         self.assertAlmostEqual(err.max(), 0., msg=msg)
 
+    def test_disorientation(self):
+        """closed form disorientation agrees with brute force search"""
+        q1 = quats.random_quats(50)
+        q2 = quats.random_quats(50)
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            qdis = sym.disorientation(q1, q2)
+            qdis_bf = sym.disorientation(q1, q2, brute_force=True)
+            msg = 'disorientation failed for: %s' % n
+            err = np.linalg.norm(qdis - qdis_bf, axis=1)
+            self.assertAlmostEqual(err.max(), 0., msg=msg)
+
+            ang = 2.0*np.arccos(np.minimum(qdis[:, 0], 1.))
+            ang_err = ang - sym.misorientation_angle(q1, q2)
+            self.assertAlmostEqual(np.abs(ang_err).max(), 0., msg=msg)
+
+        qdis = cs.get_symmetries('cubic').disorientation(q1, q2)
+        self.assertTrue(np.all(qdis[:, 1] >= qdis[:, 2]))
+        self.assertTrue(np.all(qdis[:, 2] >= qdis[:, 3]))
+        self.assertTrue(np.all(qdis[:, 3] >= 0.))
+
+    def test_pair_misorientations(self):
+        """misorientations of indexed pairs match direct computation"""
+        q = quats.random_quats(20)
+        i = np.array([0, 1, 2, 3, 4, 5, 6, 7, 7])
+        j = np.array([9, 8, 7, 6, 5, 4, 3, 2, 7])
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            angles = np.zeros(len(i))
+            ang, axes = sym.pair_misorientations(
+                q, i, j, chunk_size=4, angles=angles
+            )
+            msg = 'pair misorientation failed for: %s' % n
+            self.assertTrue(ang is angles, msg=msg)
+            ang_ref = sym.misorientation_angle(q[i], q[j])
+            self.assertAlmostEqual(np.abs(ang - ang_ref).max(), 0., msg=msg)
+
+            qmis = sym.misorientation(q[i], q[j])
+            qax = np.hstack((
+                np.cos(0.5*ang)[:, None], np.sin(0.5*ang)[:, None] * axes
+            ))
+            err = np.linalg.norm(qax - qmis, axis=1)
+            self.assertAlmostEqual(err.max(), 0., msg=msg)
+            self.assertTrue(np.allclose(axes[-1], (1, 0, 0)), msg=msg)
+
+    def test_pair_misorientations_outputs(self):
+        """preallocated outputs must match the number of pairs"""
+        q = quats.random_quats(20)
+        i, j = np.arange(5), np.arange(5, 10)
+        sym = cs.get_symmetries('cubic')
+        for kwargs in (
+            dict(angles=np.zeros(6)), dict(angles=np.zeros((5, 1))),
+            dict(axes=np.zeros((6, 3))), dict(axes=np.zeros((5, 4)))
+        ):
+            with self.assertRaises(ValueError):
+                sym.pair_misorientations(q, i, j, **kwargs)
+
     pass  # end class
 
 
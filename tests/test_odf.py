@@ -0,0 +1,96 @@
+"""Unit tests for odf module
+"""
+import unittest
+
+import numpy as np
+
+from polycrystal.orientations import crystalsymmetry as cs
+from polycrystal.orientations import quaternions as quats
+from polycrystal.orientations import sampling
+from polycrystal.orientations.odf import KernelODF
+
+
+class TestKernelODF(unittest.TestCase):
+    """TestKernelODF"""
+
+    def setUp(self):
+        self.q = quats.random_quats(30, rng=1)
+        self.g = quats.random_quats(40, rng=2)
+        self.halfwidth = np.radians(20.)
+
+    def _brute_force(self, odf):
+        """ODF from sum over all samples and symmetries"""
+        qmis = quats.outer_multiply(quats.inverse(self.q), self.g)
+        c = np.abs(qmis @ odf.csym.quats.T)
+        k = np.exp(
+            2*odf.kappa*np.log(c) + odf._log_normalization
+        )
+        return k.sum(axis=(0, 2))/(len(self.q)*odf.csym.nsymm)
+
+    def test_evaluate(self):
+        """ODF agrees with brute force sum"""
+        for n in ('cubic', 'hexagonal', 'identity'):
+            sym = cs.get_symmetries(n)
+            msg = 'ODF failed for symmetries: %s' % n
+            odf = KernelODF(self.q, sym, self.halfwidth, tol=1e-12)
+            f = odf.evaluate(self.g, chunk_size=100)
+            f_bf = self._brute_force(odf)
+            self.assertAlmostEqual(np.abs(f/f_bf - 1.).max(), 0., msg=msg)
+
+    def test_kernel(self):
+        """kernel is half its maximum at the halfwidth"""
+        odf = KernelODF(self.q, cs.get_symmetries('cubic'), self.halfwidth)
+        k0, kh = odf.kernel([0., self.halfwidth])
+        self.assertAlmostEqual(kh/k0, 0.5)
+        self.assertAlmostEqual(odf.kernel(odf.cutoff)/k0, odf.tol)
+
+    def test_normalization(self):
+        """mean of the ODF over orientation space is 1"""
+        g = sampling.hopf_grid(0.15)
+        odf = KernelODF(self.q[:3], cs.get_symmetries('identity'), 0.4)
+        self.assertAlmostEqual(odf.evaluate(g).mean(), 1., places=3)
+
+    def test_weights(self):
+        """weighted ODF is the weighted sum of single orientation ODFs"""
+        sym = cs.get_symmetries('hexagonal')
+        w = np.array([1., 3.])
+        f = KernelODF(self.q[:2], sym, self.halfwidth, w).evaluate(self.g)
+        f0 = KernelODF(self.q[:1], sym, self.halfwidth).evaluate(self.g)
+        f1 = KernelODF(self.q[1:2], sym, self.halfwidth).evaluate(self.g)
+        self.assertAlmostEqual(np.abs(f - 0.25*f0 - 0.75*f1).max(), 0.)
+
+    def test_binning(self):
+        """binned orientations give nearly the same ODF"""
+        sym = cs.get_symmetries('cubic')
+        qc = quats.random_quats(3, rng=3)
+        spread = quats.from_exp(0.1*quats.random_quats(3000, rng=4)[:, 1:])
+        q = quats.multiply(qc[np.arange(3000) % 3], spread)
+
+        odf = KernelODF(q, sym, self.halfwidth)
+        odf_bin = KernelODF(q, sym, self.halfwidth, resolution=0.05)
+        self.assertLess(len(odf_bin.q), len(q))
+        self.assertAlmostEqual(odf_bin.weights.sum(), len(q))
+        f, f_bin = odf.evaluate(self.g), odf_bin.evaluate(self.g)
+        self.assertLess(np.abs(f_bin - f).max()/f.max(), 0.02)
+
+    def test_binning_fine(self):
+        """bins stay distinct when the lattice is too large for int keys"""
+        # With 2**22 cells along an axis, packed keys would overflow and
+        # merge the first two orientations.
+        q1 = 1. - 1.5e-7
+        q = np.array([
+            [0.6, 0., 0.8, 0.], [0.6, 0., 0.8, 1e-5],
+            [np.sqrt(1. - q1**2), q1, 0., 0.]
+        ])
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+        odf = KernelODF(
+            q, cs.get_symmetries('identity'), self.halfwidth,
+            resolution=2.**-21
+        )
+        self.assertEqual(len(odf.q), 3)
+        self.assertTrue(np.array_equal(odf.weights, np.ones(3)))
+
+    def test_halfwidth(self):
+        """halfwidth must be between 0 and pi"""
+        with self.assertRaises(ValueError):
+            KernelODF(self.q, cs.get_symmetries('cubic'), 0.)
@@ -0,0 +1,75 @@
+"""Unit tests for orientation_index module
+"""
+import unittest
+
+import numpy as np
+
+from polycrystal.orientations import crystalsymmetry as cs
+from polycrystal.orientations import quaternions as quats
+from polycrystal.orientations.orientation_index import OrientationIndex
+
+
+class TestOrientationIndex(unittest.TestCase):
+    """TestOrientationIndex"""
+
+    def setUp(self):
+        self.ref = quats.random_quats(100)
+        self.q = quats.random_quats(20)
+
+    def _brute_force(self, sym):
+        return np.array(
+            [sym.misorientation_angle(q, self.ref) for q in self.q]
+        )
+
+    def test_query(self):
+        """k nearest agree with brute force"""
+        for n in ('cubic', 'hexagonal', 'identity'):
+            sym = cs.get_symmetries(n)
+            angles, indices = OrientationIndex(self.ref, sym).query(self.q, 4)
+            ang_bf = self._brute_force(sym)
+            ind_bf = np.argsort(ang_bf, axis=1)[:, :4]
+            msg = 'query failed for symmetries: %s' % n
+            self.assertTrue(np.array_equal(indices, ind_bf), msg=msg)
+            err = angles - np.take_along_axis(ang_bf, ind_bf, axis=1)
+            self.assertAlmostEqual(np.abs(err).max(), 0., msg=msg)
+
+    def test_query_few_references(self):
+        """missing neighbors when k exceeds number of references"""
+        sym = cs.get_symmetries('cubic')
+        angles, indices = OrientationIndex(self.ref[:2], sym).query(self.q, 3)
+        self.assertTrue(np.all(np.isinf(angles[:, 2])))
+        self.assertTrue(np.all(indices[:, 2] == 2))
+        self.assertTrue(np.all(np.sort(indices[:, :2], axis=1) == [0, 1]))
+
+    def test_query_radius(self):
+        """radius queries agree with brute force"""
+        angle = 0.4
+        for n in ('cubic', 'hexagonal'):
+            sym = cs.get_symmetries(n)
+            found = OrientationIndex(self.ref, sym).query_radius(self.q, angle)
+            ang_bf = self._brute_force(sym)
+            msg = 'radius query failed for symmetries: %s' % n
+            for i in range(len(self.q)):
+                expected = np.nonzero(ang_bf[i] < angle)[0]
+                self.assertTrue(np.array_equal(found[i], expected), msg=msg)
+
+    def test_query_pairs(self):
+        """pair queries agree with brute force"""
+        angle = 0.4
+        for n in ('cubic', 'hexagonal'):
+            sym = cs.get_symmetries(n)
+            i, j, chord = OrientationIndex(self.ref, sym).query_pairs(
+                self.q, angle
+            )
+            ang_bf = self._brute_force(sym)
+            msg = 'pair query failed for symmetries: %s' % n
+            expected = np.nonzero(ang_bf < angle)
+            order = np.lexsort((j, i))
+            self.assertTrue(np.array_equal(i[order], expected[0]), msg=msg)
+            self.assertTrue(np.array_equal(j[order], expected[1]), msg=msg)
+            err = 4*np.arcsin(0.5*chord[order]) - ang_bf[expected]
+            self.assertAlmostEqual(np.abs(err).max(), 0., msg=msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
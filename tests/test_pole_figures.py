@@ -0,0 +1,69 @@
+"""Unit tests for pole_figures module
+"""
+import unittest
+
+import numpy as np
+
+from polycrystal.orientations import crystalsymmetry as cs
+from polycrystal.orientations import quaternions as quats
+from polycrystal.orientations import pole_figures as pfm
+
+
+class TestPoleFigures(unittest.TestCase):
+    """TestPoleFigures"""
+
+    def setUp(self):
+        self.rmats = quats.random_rmats(20000, rng=1)
+        self.cubic = cs.get_symmetries('cubic')
+        self.ident = cs.get_symmetries('identity')
+
+    def test_projection(self):
+        """projection is equal-area and identifies opposite directions"""
+        v = quats.random_quats(10000, rng=2)[:, 1:]
+        v /= np.linalg.norm(v, axis=1)[:, None]
+        xy = pfm.equal_area_projection(v)
+        self.assertTrue(np.allclose(xy, pfm.equal_area_projection(-v)))
+        # Uniform on hemisphere gives uniform on disk: r^2 is uniform.
+        r2 = np.sum(xy*xy, axis=1)
+        self.assertLessEqual(r2.max(), 1.)
+        self.assertAlmostEqual(r2.mean(), 0.5, delta=0.02)
+
+    def test_uniform(self):
+        """random orientations give density near 1"""
+        pf = pfm.pole_figure(self.rmats, self.cubic, [1, 1, 1], nbins=8)
+        x, y = np.meshgrid(pf.centers, pf.centers, indexing='ij')
+        inner = (x*x + y*y) < 0.6
+        self.assertAlmostEqual(pf.total, 24*len(self.rmats))
+        self.assertAlmostEqual(np.mean(pf.density[inner]), 1., delta=0.02)
+        self.assertTrue(np.all(np.isnan(pf.density[(x*x + y*y) > 1.])))
+
+    def test_single(self):
+        """pole and inverse pole of a single orientation"""
+        r = self.rmats[:1]
+        h = np.array([0., 0.6, 0.8])
+        pf = pfm.pole_figure(r, self.ident, h, nbins=10)
+        expected = pfm.PoleFigure(10)
+        expected.add(r[0] @ h)
+        self.assertTrue(np.array_equal(pf.counts, expected.counts))
+
+        ipf = pfm.inverse_pole_figure(r, self.ident, h, nbins=10)
+        expected = pfm.PoleFigure(10)
+        expected.add(r[0].T @ h)
+        self.assertTrue(np.array_equal(ipf.counts, expected.counts))
+
+    def test_chunks(self):
+        """chunks and weights are accumulated"""
+        w = np.linspace(1., 2., len(self.rmats))
+        pf = pfm.inverse_pole_figure(
+            self.rmats, self.cubic, [0, 0, 1], weights=w, nbins=12
+        )
+        pf_chunked = pfm.inverse_pole_figure(
+            self.rmats, self.cubic, [0, 0, 1], weights=w, nbins=12,
+            chunk_size=1000
+        )
+        self.assertAlmostEqual(np.abs(pf.counts - pf_chunked.counts).max(), 0.)
+        self.assertAlmostEqual(pf.total, 24*w.sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
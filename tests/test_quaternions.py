@@ -100,6 +100,28 @@ class TestQuats(unittest.TestCase):
         err = np.linalg.norm(q - self.qz, axis=1)
         self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
 
+    def test_from_rmats_round_trip(self):
+        """round trip for general and near 180 degree rotations"""
+        q = quats.random_quats(50)
+        q[25:, 0] = 1e-9
+        q = q/np.linalg.norm(q, axis=1).reshape(50, 1)
+        q[q[:, 0] < 0] *= -1
+
+        msg = 'round trip failed'
+        out = np.zeros((50, 4))
+        qr = quats.from_rmats(quats.to_rmats(q), out=out)
+        self.assertTrue(qr is out, msg=msg)
+        err = np.linalg.norm(qr - q, axis=1)
+        self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
+
+        r = quats.to_rmats(q)
+        bad = (np.zeros((49, 4)), np.zeros((50, 3)), np.zeros((50, 4), int))
+        for out in bad:
+            with self.assertRaises(ValueError):
+                quats.from_rmats(r, out=out)
+        with self.assertWarns(DeprecationWarning):
+            quats.from_rmats(r, 1e-6)
+
     def test_to_rmats(self):
         """quaternion array to rotation matrices"""
         msg = 'failed on identity'
@@ -153,5 +175,106 @@ class TestQuats(unittest.TestCase):
 
         self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
 
+    def test_multiply_broadcast(self):
+        """broadcast products, output buffers and conjugate products"""
+        q1 = quats.random_quats(5)
+        q2 = quats.random_quats(3)
+
+        msg = 'outer product failed to agree with pairwise products'
+        qo = quats.outer_multiply(q1, q2)
+        self.assertEqual(qo.shape, (5, 3, 4))
+        for i in range(5):
+            err = np.linalg.norm(qo[i] - quats.multiply(q1[i], q2), axis=1)
+            self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
+
+        msg = 'product into output buffer failed'
+        out = np.zeros((5, 3, 4))
+        qp = quats.multiply(
+            q1[:, None, :], q2[None, :, :], out=out, normalize=False
+        )
+        self.assertTrue(qp is out, msg=msg)
+        self.assertAlmostEqual(np.abs(out - qo).max(), 0., places=12, msg=msg)
+
+        msg = 'product into input buffer failed'
+        q1c = q1.copy()
+        quats.multiply(q1c, q2[0], out=q1c)
+        err = np.abs(q1c - quats.multiply(q1, q2[0]))
+        self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
+
+        msg = 'conjugate product failed'
+        qc = quats.conjugate_multiply(q1[:3], q2)
+        qi = quats.multiply(quats.inverse(q1[:3]), q2)
+        self.assertAlmostEqual(np.abs(qc - qi).max(), 0., places=12, msg=msg)
+        qc = quats.conjugate_multiply(q1, q1, normalize=False)
+        self.assertTrue(np.all(qc[:, 1:] == 0.), msg=msg)
+
+    def test_rotate_vectors(self):
+        """rotation of vectors agrees with rotation matrices"""
+        msg = 'failed to agree with rotation matrices'
+        q = quats.random_quats(5)
+        v = np.linspace(-1, 2, 12).reshape(4, 3)
+        r = quats.to_rmats(q)
+
+        vr = quats.rotate_vectors(q, v[0])
+        err = np.linalg.norm(vr - r @ v[0], axis=1)
+        self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
+
+        vr = quats.rotate_vectors_outer(q, v)
+        self.assertEqual(vr.shape, (5, 4, 3))
+        err = np.linalg.norm(vr - np.einsum('ijk,lk->ilj', r, v), axis=2)
+        self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
+
+        msg = 'failed to rotate in place'
+        v5 = np.tile(v[1], (5, 1))
+        quats.rotate_vectors(q, v5, out=v5)
+        err = np.linalg.norm(v5 - r @ v[1], axis=1)
+        self.assertAlmostEqual(err.max(), 0., places=12, msg=msg)
+
+    def test_random_quats(self):
+        """random quaternions are reproducible with a seed"""
+        msg = 'seeded random quaternions failed'
+        q1 = quats.random_quats(20, rng=7)
+        q2 = quats.random_quats(20, rng=np.random.default_rng(7))
+        self.assertTrue(np.array_equal(q1, q2), msg=msg)
+        nrm = np.linalg.norm(q1, axis=1)
+        self.assertAlmostEqual(np.abs(nrm - 1.).max(), 0., msg=msg)
+
+        msg = 'float32 random orientations failed'
+        q = quats.random_quats(20, rng=7, dtype=np.float32)
+        self.assertEqual(q.dtype, np.float32, msg=msg)
+        r = quats.random_rmats(5, rng=7, dtype=np.float32)
+        self.assertEqual(r.dtype, np.float32, msg=msg)
+        self.assertEqual(r.shape, (5, 3, 3), msg=msg)
+
+    def test_random_quats_chunks(self):
+        """chunks are reproducible and match their spawned generators"""
+        msg = 'random chunks failed'
+        chunks = list(quats.random_quats_chunks(25, 10, seed=3))
+        self.assertEqual([len(c) for c in chunks], [10, 10, 5], msg=msg)
+        again = list(quats.random_quats_chunks(25, 10, seed=3))
+        for c, a in zip(chunks, again):
+            self.assertTrue(np.array_equal(c, a), msg=msg)
+
+        children = np.random.SeedSequence(3).spawn(3)
+        q = quats.random_quats(10, rng=children[1])
+        self.assertTrue(np.array_equal(chunks[1], q), msg=msg)
+
+    def test_float32(self):
+        """float32 quaternions give float32 results"""
+        msg = 'float32 results failed'
+        q = quats.random_quats(20, rng=11)
+        q32 = q.astype(np.float32)
+        r32 = quats.to_rmats(q32)
+        self.assertEqual(r32.dtype, np.float32, msg=msg)
+        self.assertLess(np.abs(r32 - quats.to_rmats(q)).max(), 1e-6, msg=msg)
+        p32 = quats.multiply(q32, q32[::-1])
+        self.assertEqual(p32.dtype, np.float32, msg=msg)
+        qr32 = quats.from_rmats(r32)
+        self.assertEqual(qr32.dtype, np.float32, msg=msg)
+        self.assertLess(np.abs(qr32 - q*np.sign(q[:, :1])).max(), 1e-6)
+        v32 = quats.rotate_vectors(q32, np.ones(3, dtype=np.float32))
+        self.assertEqual(v32.dtype, np.float32, msg=msg)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+"""Unit tests for sampling module
+"""
+import unittest
+
+import numpy as np
+
+from polycrystal.orientations import crystalsymmetry as cs
+from polycrystal.orientations import quaternions as quats
+from polycrystal.orientations import sampling
+from polycrystal.orientations.orientation_index import OrientationIndex
+
+
+class TestHopfGrid(unittest.TestCase):
+    """TestHopfGrid"""
+
+    def setUp(self):
+        self.res = 0.2
+        self.grid = sampling.hopf_grid(self.res)
+
+    def test_size(self):
+        """grid has the expected size and unit quaternions"""
+        n2, n1 = sampling.grid_shape(self.res)
+        self.assertEqual(self.grid.shape, (n1*n2, 4))
+        nrm = np.linalg.norm(self.grid, axis=1)
+        self.assertTrue(np.allclose(nrm, 1.))
+        self.assertTrue(np.all(self.grid[:, 0] >= 0.))
+
+    def test_chunks(self):
+        """chunked grid is the same as the full grid"""
+        chunks = list(sampling.hopf_grid_chunks(self.res, chunk_size=999))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(np.array_equal(np.concatenate(chunks), self.grid))
+
+    def test_coverage(self):
+        """every orientation is within the resolution of a grid point"""
+        index = OrientationIndex(self.grid, cs.get_symmetries('identity'))
+        angles, _ = index.query(quats.random_quats(500))
+        self.assertLess(angles.max(), self.res)
+
+    def test_uniform(self):
+        """average rotation matrix of the grid is near zero"""
+        rmean = quats.to_rmats(self.grid).mean(axis=0)
+        self.assertLess(np.abs(rmean).max(), 1e-3)
+
+    def test_fundamental_region(self):
+        """restricted grid is the part of the grid in the fundamental region"""
+        for n in cs.list_symmetries():
+            sym = cs.get_symmetries(n)
+            msg = 'fundamental region grid failed for symmetries: %s' % n
+            qfr = sampling.hopf_grid(self.res, sym)
+            err = np.linalg.norm(qfr - sym.to_fundamental_region(qfr), axis=1)
+            self.assertAlmostEqual(err.max(), 0., msg=msg)
+            ratio = len(self.grid)/len(qfr)
+            self.assertAlmostEqual(ratio/sym.nsymm, 1., delta=0.05, msg=msg)
+
+    def test_resolution(self):
+        """resolution must be positive"""
+        with self.assertRaises(ValueError):
+            sampling.grid_shape(0.)
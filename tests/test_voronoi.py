@@ -98,6 +98,15 @@ def test_random():
     assert np.all(v.box == box)
 
 
+def test_random_seeded():
+    n = 20
+    box = np.stack((np.zeros(3), np.ones(3)), axis=1)
+    v1 = voronoi.Voronoi.random_voronoi(n, box, rng=5)
+    v2 = voronoi.Voronoi.random_voronoi(n, box, rng=5)
+    assert np.all(v1.seeds == v2.seeds)
+    assert np.all(v1.orientations == v2.orientations)
+
+
 def test_save_load_random(tmp_path):
     p = tmp_path / "random.npz"
     n = 20
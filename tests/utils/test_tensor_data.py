@@ -89,3 +89,21 @@ def test_system(Sys, random_matrices):
     if hasattr(ms, "symmdev"):
         ms2 = Sys.from_parts(symmdev=vsdv, skew=vskw, sph=vsph)
         assert np.allclose(ms.matrices, ms2.matrices)
+
+
+@pytest.mark.parametrize("Sys", [MandelSystem, VoigtSystem, SymmDevSystem])
+def test_float32(Sys, random_matrices):
+    """Check that float32 data stays float32"""
+    m32 = random_matrices.astype(np.float32)
+    ms = Sys(m32)
+    assert ms.components.dtype == np.float32
+    assert np.allclose(
+        ms.components, Sys(random_matrices).components, atol=1e-6
+    )
+
+    mats = Sys.to_matrices(ms.components)
+    assert mats.dtype == np.float32
+    assert np.allclose(mats, random_matrices, atol=1e-6)
+
+    ms2 = Sys.from_parts(skew=ms.skew)
+    assert ms2.components.dtype == np.float32
@@ -17,3 +17,13 @@ def test_unique_vectors():
 
     au, inverse = uv.unique_vectors(a, return_inverse=True)
     assert(np.all(a == b[inverse]))
+
+
+def test_unique_vectors_tol():
+    """test unique_vectors with values equal within tolerance"""
+    a = np.array([[1, 2], [1 + 1e-10, 2], [1, 2.5], [1 - 1e-10, 2 + 1e-10]])
+    au, index, inverse = uv.unique_vectors(
+        a, return_index=True, return_inverse=True
+    )
+    assert len(au) == 2
+    assert np.all(inverse.ravel()[[0, 1, 3]] == inverse.ravel()[0])